@@ -0,0 +1,58 @@
+import torch
+
+from torchglyph.cache import DatasetCache
+from torchglyph.dataset import Dataset, DataLoader
+from torchglyph.pipe import PaddedNumPipe, PaddedStrListPipe
+from torchglyph.proc import LoadFastText
+
+
+class Toy(Dataset):
+    @classmethod
+    def load(cls, path, **kwargs):
+        with path.open(mode='r', encoding='utf-8') as fp:
+            for index, line in enumerate(fp):
+                yield index, line.split()
+
+    def get_size(self, item) -> int:
+        return len(item['word'])
+
+
+def test_dataset_cache(tmp_path):
+    path = tmp_path / 'toy.txt'
+    path.write_text('a b c\nb c\nc d e f\n', encoding='utf-8')
+
+    index = PaddedNumPipe(device=torch.device('cpu'))
+    word = PaddedStrListPipe(device=torch.device('cpu'), threshold=1)
+    pipes = [dict(index=index), dict(word=word)]
+
+    dataset = Toy(pipes=pipes, path=path)
+    word.build_vocab_(dataset)
+    expected, = DataLoader.new((dataset,), batch_size=16, shuffle=False)
+
+    cache = DatasetCache(path, pipes=pipes, root=tmp_path, name='toy')
+    assert not cache.exists()
+    cache.save(dataset)
+    assert cache.exists()
+
+    word.vocab = None
+    actual, = cache.load(Toy)
+    assert word.vocab.itos == dataset.vocabs.word.itos
+
+    loader, = DataLoader.new((actual,), batch_size=16, shuffle=False)
+    for x, y in zip(loader, expected):
+        assert torch.equal(x.index, y.index)
+        assert torch.equal(x.word, y.word)
+
+
+def test_dataset_cache_digest(tmp_path):
+    path = tmp_path / 'toy.txt'
+    path.write_text('a b c\n', encoding='utf-8')
+
+    digests = set()
+    for lang in ['en', 'de']:
+        for dtype in [None, torch.int8]:
+            word = PaddedStrListPipe(device=torch.device('cpu'))
+            word.with_(vocab=... + LoadFastText(str.lower, name='cc', lang=lang, restrict=True, dtype=dtype))
+            digests.add(DatasetCache.digest(path, pipes=[dict(word=word)]))
+
+    assert len(digests) == 4
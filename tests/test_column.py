@@ -0,0 +1,39 @@
+import torch
+from torchrua import CattedSequence
+
+from torchglyph.column import TensorColumn, CattedColumn, to_column
+
+
+def test_tensor_column():
+    tensors = [torch.arange(n) for n in [3, 0, 1, 4]]
+    column = to_column(tensors)
+
+    assert isinstance(column, TensorColumn)
+    assert len(column) == 4
+    assert column.token_sizes.tolist() == [3, 0, 1, 4]
+    for index, tensor in enumerate(tensors):
+        assert torch.equal(column[index], tensor)
+    assert torch.equal(column[-1], tensors[-1])
+    assert column[3].data_ptr() == column.data[4:].data_ptr()
+
+
+def test_catted_column():
+    sequences = [
+        CattedSequence(data=torch.arange(5), token_sizes=torch.tensor([2, 3])),
+        CattedSequence(data=torch.arange(1), token_sizes=torch.tensor([1])),
+    ]
+    column = to_column(sequences)
+
+    assert isinstance(column, CattedColumn)
+    assert len(column) == 2
+    for actual, expected in zip(column, sequences):
+        assert torch.equal(actual.data, expected.data)
+        assert torch.equal(actual.token_sizes, expected.token_sizes)
+
+
+def test_to_column_fallback():
+    scalars = [torch.tensor(1), torch.tensor(2)]
+    assert to_column(scalars) is scalars
+
+    mixed = [torch.zeros((2,), dtype=torch.long), torch.zeros((2,), dtype=torch.float)]
+    assert to_column(mixed) is mixed
@@ -0,0 +1,107 @@
+import torch
+
+from torchglyph.dataset import Dataset, StreamDataset, DataLoader
+from torchglyph.pipe import PaddedNumPipe, PaddedNumListPipe, PackedNumListPipe
+from torchglyph.sampler import BucketBatchSampler
+
+
+class Toy(Dataset):
+    @classmethod
+    def load(cls, num_items: int = 12, **kwargs):
+        for index in range(num_items):
+            yield index, list(range(index % 5 + 1))
+
+    def get_size(self, item) -> int:
+        return len(item['token'])
+
+    @classmethod
+    def new(cls, **kwargs):
+        index = PaddedNumPipe(device=torch.device('cpu'))
+        token = PaddedNumListPipe(device=torch.device('cpu'))
+        return cls(pipes=[dict(index=index), dict(token=token)], **kwargs)
+
+
+def test_data_loader_num_workers():
+    dataset = Toy.new()
+    expected, = DataLoader.new((dataset,), batch_size=8, shuffle=False)
+    loader, = DataLoader.new((dataset,), batch_size=8, shuffle=False, num_workers=2)
+
+    batches = list(loader)
+    assert all(type(batch) is dataset.named_tuple for batch in batches)
+    assert [batch.index.tolist() for batch in batches] == [batch.index.tolist() for batch in expected]
+    assert [batch.token.tolist() for batch in batches] == [batch.token.tolist() for batch in expected]
+
+
+def test_data_loader_columnar():
+    expected, = DataLoader.new((Toy.new(),), batch_size=8, shuffle=False)
+    loader, = DataLoader.new((Toy.new(),), batch_size=8, shuffle=False, columnar=True)
+
+    assert [batch.token.tolist() for batch in loader] == [batch.token.tolist() for batch in expected]
+
+
+def test_data_loader_bucket():
+    dataset = Toy.new(num_items=64)
+    loader, = DataLoader.new((dataset,), batch_size=8, shuffle=False, bucket=True, boundaries=[2, 4])
+    assert isinstance(loader.batch_sampler, BucketBatchSampler)
+
+    batches = [batch.index.tolist() for batch in loader]
+    assert sorted(index for batch in batches for index in batch) == list(range(64))
+    assert all(len(batch) * max(index % 5 + 1 for index in batch) <= 8 for batch in batches)
+    assert [batch.index.tolist() for batch in loader] == batches
+
+
+def test_data_loader_precollate(tmp_path):
+    index = PaddedNumPipe(device=torch.device('cpu'))
+    token = PackedNumListPipe(device=torch.device('cpu'))
+    dataset = Toy(pipes=[dict(index=index), dict(token=token)])
+
+    expected, = DataLoader.new((dataset,), batch_size=8, shuffle=False)
+    loader, = DataLoader.new((dataset,), batch_size=8, shuffle=False, precollate=True, precollate_path=tmp_path)
+    assert len(list(tmp_path.glob('batches.0.*.pt'))) == 1
+
+    loader, = DataLoader.new((dataset,), batch_size=8, shuffle=False, precollate=True, precollate_path=tmp_path)
+    assert len(list(tmp_path.glob('batches.0.*.pt'))) == 1
+    assert [batch.token.data.tolist() for batch in loader] == [batch.token.data.tolist() for batch in expected]
+
+    expected, = DataLoader.new((dataset,), batch_size=16, shuffle=False)
+    loader, = DataLoader.new((dataset,), batch_size=16, shuffle=False, precollate=True, precollate_path=tmp_path)
+    assert len(list(tmp_path.glob('batches.0.*.pt'))) == 2
+    assert [batch.token.data.tolist() for batch in loader] == [batch.token.data.tolist() for batch in expected]
+
+
+class ToyStream(StreamDataset):
+    load = Toy.load
+    get_size = Toy.get_size
+
+    @classmethod
+    def new(cls, **kwargs):
+        index = PaddedNumPipe(device=torch.device('cpu'))
+        token = PaddedNumListPipe(device=torch.device('cpu'))
+        return cls(pipes=[dict(index=index), dict(token=token)], batch_size=8, buffer_size=4, **kwargs)
+
+
+def test_stream_dataset_set_epoch():
+    dataset = ToyStream.new(num_items=64)
+
+    def indices(num_workers: int):
+        loader = DataLoader.from_stream(dataset, num_workers=num_workers)
+        batches = list(loader)
+        assert all(type(batch) is dataset.named_tuple for batch in batches)
+        return [index for batch in batches for index in batch.index.tolist()]
+
+    epoch0 = indices(num_workers=0)
+    assert sorted(epoch0) == list(range(64))
+    assert indices(num_workers=0) == epoch0
+
+    dataset.set_epoch(1)
+    assert indices(num_workers=0) != epoch0
+    assert sorted(indices(num_workers=2)) == list(range(64))
+
+
+def test_stream_data_loader_state_dict():
+    loader = DataLoader.from_stream(ToyStream.new(num_items=16))
+    state_dict = loader.state_dict()
+    assert len(state_dict) == 0
+
+    assert loader.load_state_dict(state_dict) == ([], [])
+    assert sorted(index for batch in loader for index in batch.index.tolist()) == list(range(16))
@@ -0,0 +1,21 @@
+import random
+
+from torchglyph.datasets.machine_translation import MachineTranslation
+
+
+def test_load_machine_translation_num_workers(tmp_path):
+    rng = random.Random(42)
+    for trailing in ['', '\n']:
+        for lang in ['de', 'en']:
+            lines = [
+                ' '.join(rng.choice('abcde') * rng.randint(1, 5) for _ in range(rng.randint(0, 12)))
+                for _ in range(500)
+            ]
+            path = tmp_path / f'train.{lang}'
+            path.write_text('\n'.join(lines) + trailing, encoding='utf-8')
+
+        expected = list(MachineTranslation.load(tmp_path / 'train', src_lang='de', tgt_lang='en', num_workers=0))
+        assert len(expected) == 500
+
+        actual = MachineTranslation.load(tmp_path / 'train', src_lang='de', tgt_lang='en', num_workers=2)
+        assert list(actual) == expected
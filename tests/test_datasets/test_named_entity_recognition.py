@@ -1,7 +1,12 @@
+import random
+
 import torch
 from torch.nn.utils.rnn import PackedSequence
 
-from torchglyph.datasets.named_entity_recognition import CoNLL2003
+from torchglyph.dataset import DataLoader
+from torchglyph.datasets.named_entity_recognition import CoNLL2003, IndexedCoNLL2003
+from torchglyph.datasets.named_entity_recognition import WordPipe, CharPipe, TagPipe
+from torchglyph.pipe import process_pool
 
 
 def test_conll2003():
@@ -24,3 +29,72 @@ def test_conll2003():
         assert isinstance(batch.word, PackedSequence)
         assert isinstance(batch.char, PackedSequence)
         assert isinstance(batch.tag, PackedSequence)
+
+
+def test_indexed_conll2003(tmp_path):
+    path = tmp_path / 'train.txt'
+    path.write_text(
+        '-DOCSTART- -X- -X- O\n\n'
+        'EU NNP B-NP B-ORG\nrejects VBZ B-VP O\nGerman JJ B-NP B-MISC\n\n'
+        'Peter NNP B-NP B-PER\nBlackburn NNP I-NP I-PER\n\n\n'
+        'BRUSSELS NNP B-NP B-LOC\n',
+        encoding='utf-8',
+    )
+
+    loaders = []
+    for dataset_type in [CoNLL2003, IndexedCoNLL2003]:
+        word, char, tag = WordPipe(device=None), CharPipe(device=None), TagPipe(device=None)
+        dataset = dataset_type(pipes=[dict(word=word, char=char), dict(tag=tag)], path=path, root=tmp_path)
+        for pipe in (word, char, tag):
+            pipe.build_vocab_(dataset)
+        loaders.append(DataLoader.new((dataset,), batch_size=32, shuffle=False)[0])
+
+    for expected, actual in zip(*loaders):
+        assert torch.equal(expected.word.data, actual.word.data)
+        assert torch.equal(expected.char.data, actual.char.data)
+        assert torch.equal(expected.tag.data, actual.tag.data)
+
+    assert len(list((tmp_path / 'indexedconll2003' / 'cache').glob('*.npy'))) == 1
+    assert sorted(tmp_path.glob('train.txt*')) == [path]
+
+
+def write_conll2003(path, trailing: str, seed: int = 42) -> None:
+    rng, lines = random.Random(seed), []
+    for _ in range(300):
+        for _ in range(rng.randint(1, 12)):
+            lines.append(f'{rng.choice("abcde") * rng.randint(1, 5)} NN B-NP {rng.choice(["O", "B-PER"])}')
+        lines.extend([''] * rng.randint(1, 3))
+
+    path.write_text('\n'.join(lines).rstrip('\n') + trailing, encoding='utf-8')
+
+
+def test_load_conll2003_num_workers(tmp_path):
+    path = tmp_path / 'train.txt'
+    for trailing in ['', '\n', '\n\n\n']:
+        write_conll2003(path, trailing=trailing)
+
+        expected = list(CoNLL2003.load(path, num_workers=0))
+        assert len(expected) == 300
+        assert list(CoNLL2003.load(path, num_workers=2)) == expected
+
+
+def test_process_conll2003_num_workers(tmp_path):
+    path = tmp_path / 'train.txt'
+    write_conll2003(path, trailing='\n')
+
+    vocabs, loaders = [], []
+    for num_workers in [0, 2]:
+        word, char, tag = WordPipe(device=None), CharPipe(device=None), TagPipe(device=None)
+        dataset = CoNLL2003(pipes=[dict(word=word, char=char), dict(tag=tag)], path=path, num_workers=num_workers)
+        with process_pool([word, char, tag], num_workers=num_workers) as pool:
+            for pipe in (word, char, tag):
+                pipe.build_vocab_(dataset, num_workers=num_workers, pool=pool)
+
+        vocabs.append([pipe.vocab.itos for pipe in (word, char, tag)])
+        loaders.append(DataLoader.new((dataset,), batch_size=32, shuffle=False, process_workers=num_workers)[0])
+
+    assert vocabs[0] == vocabs[1]
+    for expected, actual in zip(*loaders):
+        assert torch.equal(expected.word.data, actual.word.data)
+        assert torch.equal(expected.char.data, actual.char.data)
+        assert torch.equal(expected.tag.data, actual.tag.data)
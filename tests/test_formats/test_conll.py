@@ -0,0 +1,24 @@
+import io
+from typing import NamedTuple
+
+from torchglyph.formats.conll import iter_sentence, loads_token
+
+
+class Config(NamedTuple):
+    word: str
+    pos_: str
+    index: int
+    flag: bool
+
+
+def test_iter_sentence():
+    fp = io.StringIO('EU NNP 0 y\nrejects VBZ 1 n\n\n\nPeter NNP 0 yes\n')
+
+    assert list(iter_sentence(fp, config=Config, sep=' ')) == [
+        (('EU', 'rejects'), (0, 1), (True, False)),
+        (('Peter',), (0,), (True,)),
+    ]
+
+
+def test_loads_token():
+    assert loads_token('EU\tNNP\t0\ty\n', config=Config) == ('EU', 0, True)
@@ -0,0 +1,42 @@
+import gzip
+
+import numpy as np
+
+from torchglyph.formats.vector import load_vector_file
+
+TOKENS = [f'token{index}' for index in range(1000)]
+VECTORS = np.random.RandomState(42).randn(1000, 5).astype(np.float32)
+
+
+def write_vectors(path, header: bool, open_fn=open) -> None:
+    with open_fn(path, mode='wt', encoding='utf-8') as fp:
+        if header:
+            fp.write(f'{len(TOKENS)} 5\n')
+        for token, vector in zip(TOKENS, VECTORS.tolist()):
+            fp.write(' '.join([token, *map(repr, vector)]) + '\n')
+
+
+def test_load_vector_file(tmp_path):
+    for header in [False, True]:
+        path = tmp_path / f'vectors.{header}.txt'
+        write_vectors(path, header=header)
+
+        for num_workers in [0, 2]:
+            tokens, vectors = load_vector_file(path, header=header, num_workers=num_workers)
+            assert tokens == TOKENS
+            assert np.array_equal(vectors, VECTORS)
+
+            keep = {'token3', 'token500', 'token999', 'missing'}
+            tokens, vectors = load_vector_file(path, header=header, keep=keep, num_workers=num_workers)
+            assert tokens == ['token3', 'token500', 'token999']
+            assert np.array_equal(vectors, VECTORS[[3, 500, 999]])
+
+
+def test_load_compressed_vector_file(tmp_path):
+    for header in [False, True]:
+        path = tmp_path / f'vectors.{header}.txt.gz'
+        write_vectors(path, header=header, open_fn=gzip.open)
+
+        tokens, vectors = load_vector_file(path, header=header, num_workers=2)
+        assert tokens == TOKENS
+        assert np.array_equal(vectors, VECTORS)
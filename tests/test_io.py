@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from torchglyph.io import download, load_manifest
+
+CONTENT = os.urandom(1 << 20)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def send_content(self, body: bool) -> None:
+        self.requests.append((self.command, self.headers.get('Range', None)))
+
+        start, end = 0, len(CONTENT)
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if match is not None:
+            start = int(match.group(1))
+            if match.group(2) != '':
+                end = int(match.group(2)) + 1
+            if start >= len(CONTENT):
+                self.send_response(416)
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end - 1}/{len(CONTENT)}')
+        else:
+            self.send_response(200)
+
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', f'{end - start}')
+        self.end_headers()
+        if body:
+            self.wfile.write(CONTENT[start:end])
+
+    def do_HEAD(self) -> None:
+        self.send_content(body=False)
+
+    def do_GET(self) -> None:
+        self.send_content(body=True)
+
+
+@pytest.fixture()
+def url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    RangeHandler.requests = []
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}/vectors.txt'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_download(url, tmp_path):
+    path = download(url=url, path=tmp_path / 'vectors.txt')
+    assert path.read_bytes() == CONTENT
+    assert load_manifest(tmp_path)['vectors.txt']['sha256'] == hashlib.sha256(CONTENT).hexdigest()
+
+    RangeHandler.requests = []
+    assert download(url=url, path=tmp_path / 'vectors.txt') == path
+    assert RangeHandler.requests == []
+
+
+def test_download_resume(url, tmp_path):
+    (tmp_path / 'vectors.txt.part').write_bytes(CONTENT[:12345])
+
+    path = download(url=url, path=tmp_path / 'vectors.txt')
+    assert path.read_bytes() == CONTENT
+    assert ('GET', 'bytes=12345-') in RangeHandler.requests
+
+
+def test_download_parts(url, tmp_path):
+    path = download(url=url, path=tmp_path / 'vectors.txt', num_workers=4, part_size=100000)
+    assert path.read_bytes() == CONTENT
+    assert sum(command == 'GET' for command, _ in RangeHandler.requests) == 11
+    assert not (tmp_path / 'vectors.txt.part.json').exists()
+
+
+def test_download_checksum(url, tmp_path):
+    with pytest.raises(IOError):
+        download(url=url, path=tmp_path / 'vectors.txt', sha256='0' * 64)
+    assert not (tmp_path / 'vectors.txt').exists()
+
+
+def test_download_parts_then_stream(url, tmp_path):
+    part_path = tmp_path / 'vectors.txt.part'
+    with part_path.open(mode='wb') as fp:
+        fp.truncate(len(CONTENT))
+        for index in range(3):
+            fp.seek(index * 100000)
+            fp.write(CONTENT[index * 100000:(index + 1) * 100000])
+    with (tmp_path / 'vectors.txt.part.json').open(mode='w', encoding='utf-8') as fp:
+        json.dump(dict(size=len(CONTENT), part_size=100000, done=[0, 1, 2]), fp)
+
+    path = download(url=url, path=tmp_path / 'vectors.txt', num_workers=0)
+    assert path.read_bytes() == CONTENT
+    assert not (tmp_path / 'vectors.txt.part.json').exists()
+
+
+def test_download_untracked(url, tmp_path):
+    (tmp_path / 'vectors.txt').write_bytes(CONTENT[:12345])
+
+    path = download(url=url, path=tmp_path / 'vectors.txt')
+    assert path.read_bytes() == CONTENT
+
+    RangeHandler.requests = []
+    (tmp_path / 'manifest.json').unlink()
+    assert download(url=url, path=tmp_path / 'vectors.txt') == path
+    assert RangeHandler.requests == [('HEAD', None)]
+    assert load_manifest(tmp_path)['vectors.txt']['sha256'] == hashlib.sha256(CONTENT).hexdigest()
@@ -0,0 +1,41 @@
+from collections import Counter
+
+import torch
+
+from torchglyph.pipe import PackedStrListPipe, PackedStrListListPipe, PaddedStrListPipe
+from torchglyph.pipe.catting import CattedStrListPipe
+
+
+def preprocess(pipe, data, num_items: int):
+    counter = Counter()
+    data = [pipe.pre_proc(datum, counter=counter if index < num_items else Counter(), name='token')
+            for index, datum in enumerate(data)]
+    pipe.vocab = pipe.vocab_proc(counter, name='token', special_tokens=(), max_size=None, min_freq=1)
+    return data
+
+
+def test_str_list_pipes_postprocess_column():
+    data = [['a', 'b', 'c'], ['b', 'x'], ['c', 'a', 'a', 'd']]
+
+    for pipe in [
+        PackedStrListPipe(device=None, dtype=torch.int32),
+        PaddedStrListPipe(device=None, dtype=torch.int32),
+        CattedStrListPipe(device=None, dtype=torch.int32),
+    ]:
+        tokens = preprocess(pipe, data, num_items=1)
+        expected = [pipe.post_proc(datum, vocab=pipe.vocab, name='token') for datum in tokens]
+        for actual, target in zip(pipe.postprocess_column(tokens, name='token'), expected):
+            assert actual.dtype == torch.int32
+            assert torch.equal(actual, target)
+
+
+def test_str_list_list_pipe_postprocess_column():
+    data = [['ab', 'c'], ['b', 'xyz']]
+
+    pipe = PackedStrListListPipe(device=None, dtype=torch.int32)
+    data = preprocess(pipe, data, num_items=1)
+
+    expected = [pipe.post_proc(datum, vocab=pipe.vocab, name='token') for datum in data]
+    for actual, target in zip(pipe.postprocess_column(data, name='token'), expected):
+        assert torch.equal(actual.data, target.data)
+        assert torch.equal(actual.token_sizes, target.token_sizes)
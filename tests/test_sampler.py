@@ -0,0 +1,111 @@
+import numpy as np
+from torch.utils.data import SequentialSampler
+
+from torchglyph.sampler import split_batches, split_padded_batches
+from torchglyph.sampler import BatchSampler, BucketBatchSampler, DistributedBatchSampler
+
+
+class Sizes(object):
+    def __init__(self, sizes) -> None:
+        self.sizes = np.array(sizes, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self.sizes.shape[0]
+
+
+def test_split_batches():
+    sizes = np.random.RandomState(42).randint(1, 40, size=500)
+    indices = np.random.RandomState(43).permutation(500)
+
+    batches, batch, batch_size = [], [], 0
+    for index, size in zip(indices.tolist(), sizes[indices].tolist()):
+        if size > 32:
+            continue
+        if batch_size + size > 32:
+            batches.append(batch)
+            batch, batch_size = [], 0
+        batch.append(index)
+        batch_size += size
+    batches.append(batch)
+
+    actual = split_batches(indices, sizes[indices], batch_size=32, drop_last=False)
+    assert [batch.tolist() for batch in actual] == batches
+
+    actual = split_batches(indices, sizes[indices], batch_size=32, drop_last=True)
+    assert [batch.tolist() for batch in actual] == batches[:-1]
+
+    assert split_batches(indices[:0], sizes[:0], batch_size=32, drop_last=False) == []
+
+
+def test_split_padded_batches():
+    sizes = np.random.RandomState(42).randint(1, 40, size=500)
+    indices = np.arange(500)
+
+    batches = split_padded_batches(indices, sizes, batch_size=64, drop_last=False)
+    assert sorted(index for batch in batches for index in batch.tolist()) == np.flatnonzero(sizes <= 64).tolist()
+    for batch in batches:
+        assert 0 < batch.shape[0] * sizes[batch].max() <= 64
+
+
+def test_batch_sampler_restart():
+    dataset = Sizes([1] * 12)
+    sampler = BatchSampler(dataset, sampler=SequentialSampler(dataset), batch_size=1, drop_last=False)
+
+    for _ in sampler:
+        break
+
+    assert len(list(sampler)) == 12
+
+
+def test_batch_sampler_resume():
+    dataset = Sizes([1] * 12)
+    sampler = BatchSampler(dataset, sampler=SequentialSampler(dataset), batch_size=1, drop_last=False)
+
+    iterator = iter(sampler)
+    assert [next(iterator) for _ in range(5)] == [[0], [1], [2], [3], [4]]
+    state_dict = sampler.state_dict()
+
+    sampler = BatchSampler(dataset, sampler=SequentialSampler(dataset), batch_size=1, drop_last=False)
+    sampler.load_state_dict(state_dict)
+    assert list(sampler) == [[index] for index in range(5, 12)]
+    assert len(list(sampler)) == 12
+
+
+def test_bucket_batch_sampler_drop_last():
+    dataset = Sizes(np.random.RandomState(42).randint(1, 50, size=2000))
+    for boundaries in [None, [10, 20, 30]]:
+        sampler = BucketBatchSampler(
+            dataset, sampler=SequentialSampler(dataset), batch_size=256,
+            drop_last=False, chunk_size=100, boundaries=boundaries,
+        )
+        batches = list(sampler)
+        assert sorted(index for batch in batches for index in batch) == list(range(2000))
+
+        sampler = BucketBatchSampler(
+            dataset, sampler=SequentialSampler(dataset), batch_size=256,
+            drop_last=True, chunk_size=100, boundaries=boundaries,
+        )
+        assert len(list(sampler)) == len(batches) - 1
+
+
+def test_distributed_batch_sampler():
+    dataset = Sizes(np.random.RandomState(42).randint(1, 50, size=2000))
+
+    def epoch(e: int):
+        samplers = [
+            DistributedBatchSampler(dataset, batch_size=256, drop_last=False, seed=1, rank=rank, world_size=4)
+            for rank in range(4)
+        ]
+        for sampler in samplers:
+            sampler.set_epoch(e)
+        return [list(sampler) for sampler in samplers]
+
+    batches = epoch(0)
+    assert len(set(len(batch) for batch in batches)) == 1
+    assert set(index for batch in batches for indices in batch for index in indices) == set(range(2000))
+
+    num_tokens = [sum(dataset.sizes[indices].sum() for indices in batch) for batch in batches]
+    assert max(num_tokens) - min(num_tokens) <= 256
+
+    assert epoch(0) == batches
+    assert epoch(1) != batches
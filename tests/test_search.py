@@ -0,0 +1,26 @@
+import torch
+from torch.nn import functional as F
+
+from torchglyph.search import blocked_topk, IVFIndex
+
+
+def test_ivf_index_search():
+    keys = torch.randn((2000, 16), generator=torch.Generator().manual_seed(42))
+    queries = torch.randn((100, 16), generator=torch.Generator().manual_seed(43))
+
+    index = IVFIndex.build(
+        lookup=keys.__getitem__, num_keys=2000, num_clusters=16,
+        generator=torch.Generator().manual_seed(44),
+    )
+    expected_scores, expected_indices = blocked_topk(queries, lookup=keys.__getitem__, num_keys=2000, k=5)
+
+    scores, indices = index.search(queries, lookup=keys.__getitem__, k=5, nprobe=16)
+    assert torch.allclose(scores, expected_scores, atol=1e-5)
+    assert torch.equal(indices, expected_indices)
+
+    scores, indices = index.search(queries, lookup=keys.__getitem__, k=5, nprobe=2)
+    assert (scores <= expected_scores + 1e-5).all()
+    assert torch.allclose(scores, F.cosine_similarity(queries[:, None, :], keys[indices], dim=-1), atol=1e-5)
+
+    scores, indices = index.search(queries[:1], lookup=keys.__getitem__, k=2000, nprobe=1)
+    assert (indices >= 0).sum() == (scores > -float('inf')).sum() < 2000
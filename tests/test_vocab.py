@@ -0,0 +1,113 @@
+from collections import Counter
+
+import torch
+
+from torchglyph.nn.embedding import TokenEmbedding
+from torchglyph.vocab import Vocab, Glove
+
+COUNTER = Counter({'the': 5, 'cat': 3, 'sat': 2, 'mat': 1})
+
+
+def test_vocab_state_dict(tmp_path):
+    vocab = Vocab(COUNTER, unk_token='<unk>', pad_token='<pad>', special_tokens=('<bos>',), min_freq=2)
+    assert vocab.itos == ['<unk>', '<pad>', '<bos>', 'the', 'cat', 'sat']
+    assert vocab.counts.tolist() == [0, 0, 0, 5, 3, 2]
+    assert vocab['mat'] == vocab.unk_idx
+    assert vocab.lookup_many(['the', 'mat', 'sat']).tolist() == [3, 0, 5]
+
+    torch.save(vocab.state_dict(), f=tmp_path / 'vocab.pt')
+
+    other = Vocab(Counter(), unk_token=None, pad_token=None)
+    other.load_state_dict(torch.load(f=tmp_path / 'vocab.pt'))
+    assert other.itos == vocab.itos
+    assert other.stoi == vocab.stoi
+    assert other.freq == vocab.freq
+    assert other.special_tokens == vocab.special_tokens
+    assert other['mat'] == other.unk_idx
+
+
+def test_vocab_load_legacy_state_dict():
+    vocab = Vocab(COUNTER, unk_token='<unk>', pad_token=None)
+
+    other = Vocab(Counter(), unk_token=None, pad_token=None)
+    other.load_state_dict({
+        'unk_idx': vocab.unk_idx,
+        'pad_idx': vocab.pad_idx,
+        'unk_token': vocab.unk_token,
+        'pad_token': vocab.pad_token,
+        'special_tokens': vocab.special_tokens,
+        'itos': dict(enumerate(vocab.itos)),
+        'stoi': dict(vocab.stoi),
+        'freq': Counter(COUNTER),
+        'vectors': None,
+    })
+
+    assert other.itos == vocab.itos
+    assert other.stoi == vocab.stoi
+    assert other.counts.tolist() == vocab.counts.tolist()
+    assert other.scales is None
+
+
+def test_vocab_load_vectors(tmp_path):
+    (tmp_path / 'glove').mkdir()
+    with (tmp_path / 'glove' / 'glove.toy.4d.txt').open(mode='w', encoding='utf-8') as fp:
+        for index, token in enumerate(['the', 'cat', 'sat', 'on']):
+            fp.write(' '.join([token, *[f'{index + 0.25 * dim}' for dim in range(4)]]) + '\n')
+
+    vectors = Glove(name='toy', dim=4, root=tmp_path)
+    vocab = Vocab(Counter({'The': 4, 'cat': 3, 'SAT': 2, 'mat': 1}), unk_token='<unk>', pad_token='<pad>')
+    tok, occ = vocab.load_vectors(str.lower, vectors=vectors)
+
+    rows = {token: index for index, token in enumerate(['the', 'cat', 'sat', 'on'])}
+
+    hits = 0
+    for index, token in enumerate(vocab.itos):
+        if token.lower() in rows:
+            expected = torch.tensor([rows[token.lower()] + 0.25 * dim for dim in range(4)])
+            assert torch.equal(vocab.vectors[index], expected)
+            hits += 1
+
+    assert (tok, occ) == (hits, 9) == (3, 9)
+    assert torch.equal(vocab.vectors[vocab.pad_idx], torch.zeros((4,)))
+
+
+def test_vocab_quantize():
+    vocab = Vocab(COUNTER, unk_token='<unk>', pad_token=None)
+    vocab.vectors = torch.randn((len(vocab), 8))
+    expected = vocab.dequantize()
+
+    vocab.quantize_(dtype=torch.int8)
+    assert vocab.vectors.dtype == torch.int8
+    assert vocab.scales.size() == (len(vocab),)
+    assert torch.allclose(vocab.dequantize(), expected, rtol=0, atol=expected.abs().max().item() / 127.)
+
+    index = torch.tensor([3, 1])
+    assert torch.equal(vocab.dequantize(index=index), vocab.dequantize()[index])
+
+    vocab.quantize_(dtype=torch.float16)
+    assert vocab.vectors.dtype == torch.float16
+    assert vocab.scales is None
+
+
+def test_vectors_int8(tmp_path):
+    (tmp_path / 'glove').mkdir()
+    with (tmp_path / 'glove' / 'glove.toy.4d.txt').open(mode='w', encoding='utf-8') as fp:
+        for index, token in enumerate(['the', 'cat', 'sat', 'on']):
+            fp.write(' '.join([token, *[f'{index + 0.25 * dim}' for dim in range(4)]]) + '\n')
+
+    for mmap in [False, True, True]:
+        vectors = Glove(name='toy', dim=4, root=tmp_path, mmap=mmap, dtype=torch.int8)
+        assert vectors.vectors.dtype == torch.int8
+
+        tensor = torch.empty((4,))
+        assert vectors.query_('sat', tensor)
+        assert torch.allclose(tensor, torch.tensor([2.0, 2.25, 2.5, 2.75]), atol=0.02)
+
+    vocab = Vocab(Counter({'cat': 3, 'on': 2, 'mat': 1}), unk_token='<unk>', pad_token='<pad>')
+    vocab.load_vectors(vectors=vectors, dtype=torch.int8)
+
+    embedding = TokenEmbedding(embedding_dim=4, freeze=True, vocab=vocab)
+    assert embedding.weight.dtype == torch.int8
+
+    indices = torch.tensor([[2, 3], [1, 0]])
+    assert torch.allclose(embedding(indices), vocab.dequantize()[indices])
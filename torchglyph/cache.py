@@ -0,0 +1,78 @@
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple, Type, TYPE_CHECKING
+
+import torch
+
+from torchglyph.pipe import Pipe
+
+if TYPE_CHECKING:
+    from torchglyph.dataset import Dataset
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'fingerprint',
+    'DatasetCache',
+]
+
+
+def fingerprint(path: Path) -> str:
+    stat = path.stat()
+    return f'{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}'
+
+
+class DatasetCache(object):
+    def __init__(self, *paths: Path, pipes: List[Dict[str, Pipe]], root: Path, **kwargs) -> None:
+        super(DatasetCache, self).__init__()
+
+        self.pipes = pipes
+        self.path = root / 'cache' / f'{self.digest(*paths, pipes=pipes, **kwargs)}.pt'
+
+    @staticmethod
+    def digest(*paths: Path, pipes: List[Dict[str, Pipe]], **kwargs) -> str:
+        sha1 = hashlib.sha1()
+
+        for path in paths:
+            sha1.update(fingerprint(path).encode('utf-8'))
+        for ps in pipes:
+            for name, pipe in ps.items():
+                sha1.update(f'{name}={pipe!r}'.encode('utf-8'))
+        for key, value in sorted(kwargs.items()):
+            sha1.update(f'{key}={value!r}'.encode('utf-8'))
+
+        return sha1.hexdigest()
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.path})'
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self, dataset_type: Type['Dataset']) -> Tuple['Dataset', ...]:
+        logger.info(f'loading datasets from {self.path}')
+        state_dict = torch.load(self.path, weights_only=False)
+
+        for ps in self.pipes:
+            for name, pipe in ps.items():
+                pipe.vocab = state_dict['vocabs'][name]
+
+        return tuple(
+            dataset_type.from_state_dict(pipes=self.pipes, state_dict=datum)
+            for datum in state_dict['datasets']
+        )
+
+    def save(self, *datasets: 'Dataset') -> None:
+        logger.info(f'saving datasets to {self.path}')
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        state_dict = {
+            'vocabs': {name: pipe.vocab for ps in self.pipes for name, pipe in ps.items()},
+            'datasets': [dataset.state_dict() for dataset in datasets],
+        }
+
+        tmp_path = self.path.with_suffix(f'.{os.getpid()}.tmp')
+        torch.save(state_dict, f=tmp_path)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,117 @@
+from typing import Any, List, Union, Iterator
+
+import torch
+from torch import Tensor
+from torchrua import CattedSequence
+
+__all__ = [
+    'Column',
+    'TensorColumn', 'CattedColumn',
+    'to_column',
+]
+
+
+class Column(object):
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __getitem__(self, index: int) -> Any:
+        raise NotImplementedError
+
+    def __iter__(self) -> Iterator[Any]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.extra_repr()})'
+
+    def extra_repr(self) -> str:
+        return f'{len(self)}'
+
+
+class TensorColumn(Column):
+    def __init__(self, data: Tensor, offsets: Tensor) -> None:
+        super(TensorColumn, self).__init__()
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_list(cls, tensors: List[Tensor]) -> 'TensorColumn':
+        token_sizes = torch.tensor([tensor.size()[0] for tensor in tensors], dtype=torch.long)
+        offsets = torch.zeros((token_sizes.size()[0] + 1,), dtype=torch.long)
+        offsets[1:] = torch.cumsum(token_sizes, dim=0)
+
+        return cls(data=torch.cat(tensors, dim=0), offsets=offsets)
+
+    def extra_repr(self) -> str:
+        return ', '.join([
+            f'{len(self)}',
+            f'{tuple(self.data.size())}',
+            f'{self.data.dtype}',
+        ])
+
+    @property
+    def token_sizes(self) -> Tensor:
+        return self.offsets[1:] - self.offsets[:-1]
+
+    def __len__(self) -> int:
+        return self.offsets.size()[0] - 1
+
+    def __getitem__(self, index: int) -> Tensor:
+        if index < 0:
+            index += len(self)
+        start, end = self.offsets[index:index + 2].tolist()
+        return self.data[start:end]
+
+
+class CattedColumn(Column):
+    def __init__(self, data: TensorColumn, token_sizes: TensorColumn) -> None:
+        super(CattedColumn, self).__init__()
+        self.data = data
+        self.token_sizes = token_sizes
+
+    @classmethod
+    def from_list(cls, sequences: List[CattedSequence]) -> 'CattedColumn':
+        return cls(
+            data=TensorColumn.from_list([sequence.data for sequence in sequences]),
+            token_sizes=TensorColumn.from_list([sequence.token_sizes for sequence in sequences]),
+        )
+
+    def extra_repr(self) -> str:
+        return ', '.join([
+            f'data={self.data.extra_repr()}',
+            f'token_sizes={self.token_sizes.extra_repr()}',
+        ])
+
+    def __len__(self) -> int:
+        return len(self.token_sizes)
+
+    def __getitem__(self, index: int) -> CattedSequence:
+        return CattedSequence(data=self.data[index], token_sizes=self.token_sizes[index])
+
+
+def is_stackable(tensors: List[Tensor]) -> bool:
+    tensor, *_ = tensors
+    if tensor.dim() == 0:
+        return False
+
+    return all(
+        torch.is_tensor(t) and t.dtype == tensor.dtype and
+        t.dim() == tensor.dim() and t.size()[1:] == tensor.size()[1:]
+        for t in tensors
+    )
+
+
+def to_column(data: Union[List[Any], Column]) -> Union[List[Any], Column]:
+    if isinstance(data, Column) or len(data) == 0:
+        return data
+
+    if all(torch.is_tensor(datum) for datum in data):
+        if is_stackable(data):
+            return TensorColumn.from_list(data)
+
+    elif all(isinstance(datum, CattedSequence) for datum in data):
+        if is_stackable([datum.data for datum in data]) and is_stackable([datum.token_sizes for datum in data]):
+            return CattedColumn.from_list(data)
+
+    return data
@@ -1,50 +1,53 @@
+import functools
+import hashlib
 import itertools
+import logging
+import random
 from collections import namedtuple, OrderedDict
 from pathlib import Path
-from typing import Iterable, Any, Type
-from typing import Union, List, Tuple, NamedTuple, Dict
+from typing import Iterable, Any, Type, Iterator, Optional
+from typing import Union, List, Tuple, NamedTuple, Dict, Sequence
 
+import numpy as np
+import torch
 from torch.distributions.utils import lazy_property
+from torch.types import Device
 from torch.utils.data import DataLoader as TorchDataLoader, SequentialSampler, RandomSampler
-from torch.utils.data import Dataset as TorchDataset
+from torch.utils.data import Dataset as TorchDataset, IterableDataset as TorchIterableDataset, get_worker_info
 from tqdm import tqdm
 
+from torchglyph.cache import DatasetCache
+from torchglyph.column import to_column
 from torchglyph.io import DownloadMixin
-from torchglyph.pipe import Pipe
-from torchglyph.sampler import BatchSampler
+from torchglyph.pipe import Pipe, process_pool
+from torchglyph.proc import ToDevice
+from torchglyph.sampler import BatchSampler, BucketBatchSampler, DistributedBatchSampler
+from torchglyph.stream import StreamMixin
+
+logger = logging.getLogger(__name__)
 
 __all__ = [
     'Dataset',
+    'StreamDataset',
     'DataLoader',
 ]
 
 
-class Dataset(TorchDataset, DownloadMixin):
-    def __init__(self, pipes: List[Dict[str, Pipe]], **kwargs) -> None:
-        super(Dataset, self).__init__()
-
+class PipesMixin(object):
+    def init_pipes_(self, pipes: List[Dict[str, Pipe]]) -> None:
         self.pipes = {}
         self.names = []
+        self.groups = []
 
         for ps in pipes:
             for name, pipe in ps.items():
                 self.pipes[name] = pipe
                 self.names.append(name)
-
-        self.data = {}
-        for datum, ps in zip(zip(*self.load(**kwargs)), pipes):
-            for name, pipe in ps.items():
-                self.data.setdefault(name, []).extend(datum)
+            self.groups.append(list(ps.keys()))
 
     def get_size(self, item: Any) -> int:
         raise NotImplementedError
 
-    def __getitem__(self, index: int) -> Dict[str, Any]:
-        return {name: self.data[name][index] for name in self.names}
-
-    def __len__(self) -> int:
-        return len(next(iter(self.data.values())))
-
     @lazy_property
     def named_tuple(self) -> Type:
         return namedtuple(f'{self.__class__.__name__}Batch', field_names=self.names)
@@ -56,16 +59,67 @@ class Dataset(TorchDataset, DownloadMixin):
             for name, pipe in self.pipes.items()
         })
 
-    def collate_fn(self, batch: List[Dict[str, Any]]) -> NamedTuple:
-        return self.named_tuple(**{
-            name: pipe.collate_fn([data[name] for data in batch])
+    def collate_tuple(self, batch: List[Dict[str, Any]], **kwargs) -> Tuple[Any, ...]:
+        return tuple(
+            pipe.collate_fn([data[name] for data in batch], **kwargs)
             for name, pipe in self.pipes.items()
-        })
+        )
+
+    def collate_fn(self, batch: List[Dict[str, Any]], **kwargs) -> NamedTuple:
+        return self.named_tuple(*self.collate_tuple(batch, **kwargs))
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state.pop('named_tuple', None)
+        return state
 
     @classmethod
     def load(cls, **kwargs) -> Iterable[Any]:
         raise NotImplementedError
 
+
+class Dataset(TorchDataset, PipesMixin, DownloadMixin):
+    def __init__(self, pipes: List[Dict[str, Pipe]], **kwargs) -> None:
+        super(Dataset, self).__init__()
+        self.init_pipes_(pipes=pipes)
+        self.init_data_(**kwargs)
+
+    def init_data_(self, **kwargs) -> None:
+        self.data = {}
+        for datum, names in zip(zip(*self.load(**kwargs)), self.groups):
+            for name in names:
+                self.data.setdefault(name, []).extend(datum)
+
+    @classmethod
+    def from_state_dict(cls, pipes: List[Dict[str, Pipe]], state_dict: OrderedDict) -> 'Dataset':
+        dataset = cls.__new__(cls)
+        dataset.init_pipes_(pipes=pipes)
+
+        dataset.data = {}
+        dataset.load_state_dict(state_dict=state_dict, strict=True)
+
+        for name in dataset.names:
+            setattr(dataset, f'{name}_pre_todo', False)
+            setattr(dataset, f'{name}_post_todo', False)
+
+        return dataset
+
+    @lazy_property
+    def sizes(self) -> np.ndarray:
+        return np.array([self.get_size(self[index]) for index in range(len(self))], dtype=np.int64)
+
+    def columnar_(self) -> 'Dataset':
+        for name, datum in self.data.items():
+            self.data[name] = to_column(datum)
+
+        return self
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        return {name: self.data[name][index] for name in self.names}
+
+    def __len__(self) -> int:
+        return len(next(iter(self.data.values())))
+
     def dump(self, fp, batch: NamedTuple, prediction: Any, *args, **kwargs) -> None:
         raise NotImplementedError
 
@@ -98,47 +152,279 @@ class Dataset(TorchDataset, DownloadMixin):
         raise NotImplementedError
 
 
+class StreamDataset(TorchIterableDataset, StreamMixin, PipesMixin, DownloadMixin):
+    def __init__(self, pipes: List[Dict[str, Pipe]], batch_size: int,
+                 buffer_size: int = 4096, shuffle: bool = True, drop_last: bool = False,
+                 seed: int = 42, **kwargs) -> None:
+        super(StreamDataset, self).__init__()
+        self.init_pipes_(pipes=pipes)
+
+        self.batch_size = batch_size
+        self.buffer_size = buffer_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+        self.kwargs = kwargs
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+
+    def iter_raw(self) -> Iterator[Dict[str, Any]]:
+        worker_info = get_worker_info()
+
+        for index, datum in enumerate(self.load(**self.kwargs)):
+            if worker_info is None or index % worker_info.num_workers == worker_info.id:
+                yield {name: data for data, names in zip(datum, self.groups) for name in names}
+
+    def iter_shuffled(self, items: Iterable[Dict[str, Any]], rng: random.Random) -> Iterator[Dict[str, Any]]:
+        buffer = []
+        for item in items:
+            if len(buffer) < self.buffer_size:
+                buffer.append(item)
+            else:
+                index = rng.randrange(len(buffer))
+                buffer[index], item = item, buffer[index]
+                yield item
+
+        rng.shuffle(buffer)
+        yield from buffer
+
+    def __iter__(self) -> Iterator[Tuple[Any, ...]]:
+        rng = random.Random(self.seed + self.epoch)
+
+        items = map(self.process, self.iter_raw())
+        if self.shuffle:
+            items = self.iter_shuffled(items, rng=rng)
+
+        batch_size = 0
+        batch = []
+        for item in items:
+            data_size = self.get_size(item)
+            if data_size > self.batch_size:
+                continue
+
+            if (data_size + batch_size) > self.batch_size:
+                yield self.collate_tuple(batch, device=None)
+                batch_size = 0
+                batch = []
+
+            batch.append(item)
+            batch_size += data_size
+
+        if not self.drop_last and batch_size > 0:
+            yield self.collate_tuple(batch, device=None)
+
+
 class DataLoader(TorchDataLoader):
     dataset: Dataset
+    transfers: Optional[Dict[str, ToDevice]] = None
+    batches: Optional[List[NamedTuple]] = None
+    epoch_state: Optional[OrderedDict] = None
+    position: int = 0
 
     @property
     def vocabs(self) -> NamedTuple:
         return self.dataset.vocabs
 
+    def transfer_(self, devices: Dict[str, Device], non_blocking: bool = False) -> 'DataLoader':
+        self.transfers = {
+            name: ToDevice(device=device, non_blocking=non_blocking)
+            for name, device in devices.items() if device is not None
+        }
+        return self
+
+    def transfer(self, batch: Union[Tuple[Any, ...], NamedTuple]) -> NamedTuple:
+        if type(batch) is tuple:
+            batch = self.dataset.named_tuple(*batch)
+
+        if self.transfers is None:
+            return batch
+
+        return batch._replace(**{
+            name: transfer(getattr(batch, name))
+            for name, transfer in self.transfers.items()
+        })
+
+    def precollate_(self, path: Optional[Path] = None) -> 'DataLoader':
+        if path is not None and path.exists():
+            logger.info(f'loading batches from {path}')
+            batches = torch.load(path, weights_only=False)
+        else:
+            batches = [tuple(batch) for batch in super(DataLoader, self).__iter__()]
+            if path is not None:
+                logger.info(f'saving batches to {path}')
+                path.parent.mkdir(parents=True, exist_ok=True)
+                torch.save(batches, f=path)
+
+        self.batches = [self.dataset.named_tuple(*batch) for batch in batches]
+        return self
+
+    def __iter__(self) -> Iterator[NamedTuple]:
+        if self.batches is not None:
+            for batch in self.batches:
+                yield self.transfer(batch)
+        elif self.batch_sampler is None:
+            for batch in super(DataLoader, self).__iter__():
+                yield self.transfer(batch)
+        else:
+            self.batch_sampler.rewind_()
+            self.epoch_state = self.batch_sampler.state_dict()
+            self.position = self.epoch_state['position']
+
+            for batch in super(DataLoader, self).__iter__():
+                self.position += 1
+                yield self.transfer(batch)
+
+            self.epoch_state = None
+
+    def state_dict(self, destination: OrderedDict = None, prefix: str = '',
+                   keep_vars: bool = False) -> OrderedDict:
+        if destination is None:
+            destination = OrderedDict()
+            destination._metadata = OrderedDict()
+
+        if self.batch_sampler is None:
+            state_dict = OrderedDict()
+        elif self.epoch_state is None:
+            state_dict = self.batch_sampler.state_dict()
+        else:
+            state_dict = OrderedDict(self.epoch_state)
+            state_dict['position'] = self.position
+
+        for name, datum in state_dict.items():
+            destination[f'{prefix}batch_sampler.{name}'] = datum
+
+        return destination
+
+    def load_state_dict(self, state_dict: OrderedDict, strict: bool = True) -> Tuple[List[str], List[str]]:
+        unexpected_keys = list(state_dict.keys())
+        if self.batch_sampler is not None:
+            prefix = 'batch_sampler.'
+            self.batch_sampler.load_state_dict(state_dict=OrderedDict([
+                (name[len(prefix):], datum)
+                for name, datum in state_dict.items() if name.startswith(prefix)
+            ]), strict=strict)
+            unexpected_keys = [name for name in unexpected_keys if not name.startswith(prefix)]
+        self.epoch_state = None
+
+        if strict:
+            assert len(unexpected_keys) == 0, f'unexpected keys {unexpected_keys}'
+
+        return [], unexpected_keys
+
+    @staticmethod
+    def precollate_digest(dataset: Dataset, **kwargs) -> str:
+        vocabs = {}
+        for name, pipe in dataset.pipes.items():
+            itos = getattr(pipe.vocab, 'itos', None)
+            if itos is not None:
+                vocabs[name] = hashlib.sha1('\n'.join(itos).encode('utf-8')).hexdigest()
+
+        return DatasetCache.digest(
+            pipes=[dataset.pipes], vocabs=vocabs,
+            sizes=hashlib.sha1(dataset.sizes.tobytes()).hexdigest(), **kwargs,
+        )
+
+    @classmethod
+    def from_stream(cls, dataset: StreamDataset, num_workers: int = 0,
+                    pin_memory: bool = False, prefetch_factor: int = 2) -> 'DataLoader':
+        kwargs = dict(num_workers=num_workers, pin_memory=pin_memory)
+        if num_workers > 0:
+            kwargs['prefetch_factor'] = prefetch_factor
+
+        loader = DataLoader(dataset=dataset, batch_size=None, collate_fn=tuple, **kwargs)
+        return loader.transfer_(
+            devices={name: pipe.device for name, pipe in dataset.pipes.items()},
+            non_blocking=pin_memory,
+        )
+
     @classmethod
     def new(cls, datasets: Tuple[Dataset, ...],
             batch_size: Union[int, Tuple[int, ...]],
-            shuffle: bool = True, drop_last: bool = False) -> List['DataLoader']:
+            shuffle: bool = True, drop_last: bool = False, columnar: bool = False,
+            process_workers: int = 0, bucket: bool = False, boundaries: Optional[Sequence[int]] = None,
+            distributed: bool = False, seed: int = 0,
+            num_workers: int = 0, pin_memory: bool = False, prefetch_factor: int = 2,
+            precollate: bool = False, precollate_path: Optional[Path] = None) -> List['DataLoader']:
         assert len(datasets) > 0
 
         batch_sizes = batch_size
         if isinstance(batch_size, int):
             batch_sizes = itertools.repeat(batch_size)
 
-        with tqdm(desc='post-processing', total=sum(len(dataset.pipes) for dataset in datasets)) as progress:
+        pipes = [pipe for dataset in datasets for pipe in dataset.pipes.values()]
+        with process_pool(pipes, num_workers=process_workers) as pool, \
+                tqdm(desc='post-processing', total=sum(len(dataset.pipes) for dataset in datasets)) as progress:
             for index, dataset in enumerate(datasets):
                 for name, pipe in dataset.pipes.items():
                     progress.set_postfix_str(f'{index}.{name}')
-                    pipe.postprocess_(dataset)
+                    pipe.postprocess_(dataset, num_workers=process_workers, pool=pool)
                     progress.update(1)
 
+                if columnar:
+                    dataset.columnar_()
+
         loaders = []
 
         for index, (dataset, batch_size) in enumerate(zip(datasets, batch_sizes)):
+            generator = None
             if index == 0 and shuffle:
-                sampler = RandomSampler(dataset, generator=None)
+                generator = torch.Generator()
+                generator.manual_seed(int(torch.empty((), dtype=torch.int64).random_().item()))
+                sampler = RandomSampler(dataset, generator=generator)
             else:
                 sampler = SequentialSampler(dataset)
 
-            batch_sampler = BatchSampler(
-                dataset=dataset, sampler=sampler, batch_size=batch_size,
-                drop_last=index == 0 and drop_last,
-            )
-
-            loaders.append(DataLoader(
-                dataset=dataset, batch_size=1,
-                collate_fn=dataset.collate_fn,
-                batch_sampler=batch_sampler,
-            ))
+            if index == 0 and distributed:
+                batch_sampler = DistributedBatchSampler(
+                    dataset=dataset, batch_size=batch_size,
+                    drop_last=drop_last, shuffle=shuffle, seed=seed,
+                )
+            elif index == 0 and bucket:
+                batch_sampler = BucketBatchSampler(
+                    dataset=dataset, sampler=sampler, batch_size=batch_size,
+                    drop_last=drop_last, boundaries=boundaries, shuffle=shuffle, generator=generator,
+                )
+            else:
+                batch_sampler = BatchSampler(
+                    dataset=dataset, sampler=sampler, batch_size=batch_size,
+                    drop_last=index == 0 and drop_last,
+                )
+
+            precollated = precollate and not (index == 0 and shuffle)
+
+            if num_workers > 0 or pin_memory or precollated:
+                kwargs = dict(num_workers=num_workers, pin_memory=pin_memory)
+                if num_workers > 0:
+                    kwargs['prefetch_factor'] = prefetch_factor
+
+                loader = DataLoader(
+                    dataset=dataset, batch_size=1,
+                    collate_fn=functools.partial(dataset.collate_tuple, device=None),
+                    batch_sampler=batch_sampler, **kwargs,
+                )
+                loader.transfer_(
+                    devices={name: pipe.device for name, pipe in dataset.pipes.items()},
+                    non_blocking=pin_memory,
+                )
+            else:
+                loader = DataLoader(
+                    dataset=dataset, batch_size=1,
+                    collate_fn=dataset.collate_fn,
+                    batch_sampler=batch_sampler,
+                )
+
+            if precollated:
+                path = None
+                if precollate_path is not None:
+                    digest = cls.precollate_digest(
+                        dataset, batch_size=batch_size, drop_last=index == 0 and drop_last,
+                        batch_sampler=type(batch_sampler).__name__, boundaries=boundaries,
+                    )
+                    path = precollate_path / f'batches.{index}.{digest[:16]}.pt'
+                loader.precollate_(path=path)
+
+            loaders.append(loader)
 
         return loaders
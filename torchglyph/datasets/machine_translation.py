@@ -1,6 +1,6 @@
 import logging
 from pathlib import Path
-from typing import Iterable, Any
+from typing import Iterable, Any, List
 from typing import Tuple
 
 import torch
@@ -8,8 +8,10 @@ from torch.types import Device
 from tqdm import tqdm
 
 from torchglyph import data_dir
+from torchglyph.cache import DatasetCache
 from torchglyph.dataset import Dataset, DataLoader
-from torchglyph.pipe import PaddedStrListPipe
+from torchglyph.io import split_line_ranges, iter_range, imap_ranges, is_compressed, open_text
+from torchglyph.pipe import PaddedStrListPipe, process_pool
 
 __all__ = [
     'MachineTranslation',
@@ -27,19 +29,44 @@ class WordPipe(PaddedStrListPipe):
         )
 
 
+def load_parallel_range(src_path: Path, src_start: int, src_end: int,
+                        tgt_path: Path, tgt_start: int, tgt_end: int, encoding: str = 'utf-8') -> List[Any]:
+    return [
+        [src.strip().split(' '), tgt.strip().split(' ')]
+        for src, tgt in zip(
+            iter_range(src_path, src_start, src_end, encoding=encoding),
+            iter_range(tgt_path, tgt_start, tgt_end, encoding=encoding),
+        )
+    ]
+
+
 class MachineTranslation(Dataset):
     @classmethod
-    def load(cls, path: Path, src_lang: str, tgt_lang: str, encoding: str = 'utf-8', **kwargs) -> Iterable[Any]:
+    def load(cls, path: Path, src_lang: str, tgt_lang: str, encoding: str = 'utf-8',
+             num_workers: int = 0, **kwargs) -> Iterable[Any]:
         src_path = path.with_name(f'{path.name}.{src_lang}')
         tgt_path = path.with_name(f'{path.name}.{tgt_lang}')
-        with src_path.open(mode='r', encoding=encoding) as src_fp:
-            with tgt_path.open(mode='r', encoding=encoding) as tgt_fp:
+
+        if num_workers > 0 and not is_compressed(src_path) and not is_compressed(tgt_path):
+            ranges = [
+                (src_path, src_start, src_end, tgt_path, tgt_start, tgt_end, encoding)
+                for src_start, src_end, tgt_start, tgt_end in split_line_ranges(
+                    src_path, tgt_path, num_ranges=num_workers * 4,
+                )
+            ]
+            yield from tqdm(imap_ranges(load_parallel_range, ranges, num_workers=num_workers),
+                            desc=f'{path.resolve()}')
+            return
+
+        with open_text(src_path, encoding=encoding) as src_fp:
+            with open_text(tgt_path, encoding=encoding) as tgt_fp:
                 for src, tgt in tqdm(zip(src_fp, tgt_fp), desc=f'{path.resolve()}'):
                     yield [src.strip().split(' '), tgt.strip().split(' ')]
 
     @classmethod
     def new(cls, batch_size: int, share_vocab: bool, src_lang: str, tgt_lang: str, *,
-            device: Device, root: Path = data_dir, **kwargs) -> Tuple['DataLoader', ...]:
+            device: Device, root: Path = data_dir, cache: bool = False, process_workers: int = 0,
+            **kwargs) -> Tuple['DataLoader', ...]:
         if share_vocab:
             src = tgt = WordPipe(device=device)
         else:
@@ -56,21 +83,36 @@ class MachineTranslation(Dataset):
                 logging.info(f'{name} => {pipe}')
 
         train, dev, test = cls.paths(root=root)
+        dataset_cache = DatasetCache(
+            *[path.with_name(f'{path.name}.{lang}') for path in (train, dev, test) for lang in (src_lang, tgt_lang)],
+            pipes=pipes, root=root / cls.__name__.lower(),
+            name=cls.__name__, share_vocab=share_vocab, src_lang=src_lang, tgt_lang=tgt_lang,
+        )
 
-        train = cls(pipes=pipes, path=train, src_lang=src_lang, tgt_lang=tgt_lang)
-        dev = cls(pipes=pipes, path=dev, src_lang=src_lang, tgt_lang=tgt_lang)
-        test = cls(pipes=pipes, path=test, src_lang=src_lang, tgt_lang=tgt_lang)
+        if cache and dataset_cache.exists():
+            train, dev, test = dataset_cache.load(cls)
+        else:
+            train = cls(pipes=pipes, path=train, src_lang=src_lang, tgt_lang=tgt_lang, num_workers=process_workers)
+            dev = cls(pipes=pipes, path=dev, src_lang=src_lang, tgt_lang=tgt_lang, num_workers=process_workers)
+            test = cls(pipes=pipes, path=test, src_lang=src_lang, tgt_lang=tgt_lang, num_workers=process_workers)
 
-        src.build_vocab_(train)
-        if not share_vocab:
-            tgt.build_vocab_(train)
+            with process_pool([src, tgt], num_workers=process_workers) as pool:
+                src.build_vocab_(train, num_workers=process_workers, pool=pool)
+                if not share_vocab:
+                    tgt.build_vocab_(train, num_workers=process_workers, pool=pool)
 
-        return DataLoader.new(
+        loaders = DataLoader.new(
             (train, dev, test),
             batch_size=batch_size,
             shuffle=True, drop_last=False,
+            process_workers=process_workers, **kwargs,
         )
 
+        if cache and not dataset_cache.exists():
+            dataset_cache.save(train, dev, test)
+
+        return loaders
+
 
 class IWSLT14(MachineTranslation):
     urls = [(
@@ -1,18 +1,30 @@
+import hashlib
 import logging
+import mmap
+import os
+from collections import OrderedDict
 from pathlib import Path
-from typing import Iterable, NamedTuple, Any, List
+from typing import Iterable, NamedTuple, Any, List, Type, Dict, Iterator
 
+import numpy as np
 import torch
 from torch.types import Device
 from tqdm import tqdm
 
 from torchglyph import data_dir
+from torchglyph.cache import DatasetCache, fingerprint
 from torchglyph.dataset import Dataset, DataLoader
-from torchglyph.formats.conll import iter_sentence
+from torchglyph.formats.conll import iter_sentence, loads_sentence, load_sentence_range
+from torchglyph.io import split_ranges, imap_ranges, is_compressed, open_text
+from torchglyph.pipe import process_pool
 from torchglyph.pipe.packing import PackedStrListPipe, PackedStrListListPipe
+from torchglyph.stream import StreamMixin
+
+logger = logging.getLogger(__name__)
 
 __all__ = [
     'CoNLL2003',
+    'IndexedCoNLL2003',
 ]
 
 
@@ -57,14 +69,23 @@ class CoNLL2003(Dataset):
         return item['word'].size()[0]
 
     @classmethod
-    def load(cls, path: Path, **kwargs) -> Iterable[NamedTuple]:
-        with tqdm(path.open(mode='r', encoding='Utf-8'), desc=f'loading {path}') as fp:
+    def load(cls, path: Path, num_workers: int = 0, **kwargs) -> Iterable[NamedTuple]:
+        if num_workers > 0 and not is_compressed(path):
+            ranges = [
+                (path, start, end, cls.Config, ' ')
+                for start, end in split_ranges(path, num_ranges=num_workers * 4, blank=True)
+            ]
+            yield from tqdm(imap_ranges(load_sentence_range, ranges, num_workers=num_workers), desc=f'loading {path}')
+            return
+
+        with tqdm(open_text(path, encoding='utf-8'), desc=f'loading {path}') as fp:
             for item in iter_sentence(fp, config=cls.Config, sep=' '):
                 yield item
 
     @classmethod
     def new(cls, batch_size: int, *, device: Device,
-            root: Path = data_dir, **kwargs) -> List['DataLoader']:
+            root: Path = data_dir, cache: bool = False, process_workers: int = 0,
+            **kwargs) -> List['DataLoader']:
         word = WordPipe(device=device)
         char = CharPipe(device=device)
         tag = TagPipe(device=device)
@@ -79,16 +100,137 @@ class CoNLL2003(Dataset):
                 logging.info(f'{name} => {pipe}')
 
         train, dev, test = cls.paths(root=root)
-        train = cls(pipes=pipes, path=train)
-        dev = cls(pipes=pipes, path=dev)
-        test = cls(pipes=pipes, path=test)
+        dataset_cache = DatasetCache(
+            train, dev, test, pipes=pipes,
+            root=root / cls.__name__.lower(), name=cls.__name__,
+        )
 
-        word.build_vocab_(train)
-        char.build_vocab_(train)
-        tag.build_vocab_(train)
+        if cache and dataset_cache.exists():
+            train, dev, test = dataset_cache.load(cls)
+        else:
+            train = cls(pipes=pipes, path=train, num_workers=process_workers)
+            dev = cls(pipes=pipes, path=dev, num_workers=process_workers)
+            test = cls(pipes=pipes, path=test, num_workers=process_workers)
 
-        return DataLoader.new(
+            with process_pool([word, char, tag], num_workers=process_workers) as pool:
+                word.build_vocab_(train, num_workers=process_workers, pool=pool)
+                char.build_vocab_(train, num_workers=process_workers, pool=pool)
+                tag.build_vocab_(train, num_workers=process_workers, pool=pool)
+
+        loaders = DataLoader.new(
             (train, dev, test),
             batch_size=batch_size,
             shuffle=True, drop_last=False,
+            process_workers=process_workers, **kwargs,
         )
+
+        if cache and not dataset_cache.exists():
+            dataset_cache.save(train, dev, test)
+
+        return loaders
+
+
+class IndexedDataset(StreamMixin, Dataset):
+    Config: Type[NamedTuple]
+    sep: str = '\t'
+    blank: str = ''
+
+    def init_data_(self, path: Path, root: Path = data_dir, mmap: bool = False, cache_size: int = 1024,
+                   encoding: str = 'utf-8', **kwargs) -> None:
+        if is_compressed(path):
+            raise ValueError(f'{path} is compressed and does not support random access')
+
+        self.path = path
+        self.mmap = mmap
+        self.cache_size = cache_size
+        self.encoding = encoding
+
+        self.spans = self.build_index(path, root=root / self.__class__.__name__.lower() / 'cache')
+        self.cache: OrderedDict = OrderedDict()
+        self.pid, self.fp, self.buffer = None, None, None
+
+    def build_index(self, path: Path, root: Path) -> np.ndarray:
+        key = f'{fingerprint(path)}:{self.blank!r}:{self.encoding}'
+        index_path = root / f'{hashlib.sha1(key.encode("utf-8")).hexdigest()}.npy'
+        if index_path.exists():
+            logger.info(f'loading index from {index_path}')
+            return np.load(index_path)
+
+        spans, start, offset = [], None, 0
+        with path.open(mode='rb') as fp:
+            for line in tqdm(fp, desc=f'indexing {path}'):
+                if line.decode(self.encoding).strip() != self.blank:
+                    if start is None:
+                        start = offset
+                elif start is not None:
+                    spans.append((start, offset))
+                    start = None
+                offset += len(line)
+
+        if start is not None:
+            spans.append((start, offset))
+
+        spans = np.array(spans, dtype=np.int64).reshape((-1, 2))
+
+        logger.info(f'saving index to {index_path}')
+        root.mkdir(parents=True, exist_ok=True)
+        tmp_path = index_path.with_suffix(f'.{os.getpid()}.npy')
+        np.save(tmp_path, spans)
+        os.replace(tmp_path, index_path)
+
+        return spans
+
+    def read(self, start: int, end: int) -> bytes:
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.fp = self.path.open(mode='rb')
+            if self.mmap:
+                self.buffer = mmap.mmap(self.fp.fileno(), length=0, access=mmap.ACCESS_READ)
+
+        if self.buffer is not None:
+            return self.buffer[start:end]
+
+        self.fp.seek(start)
+        return self.fp.read(end - start)
+
+    def raw(self, index: int) -> Dict[str, Any]:
+        if index < 0:
+            index += len(self)
+
+        if index in self.cache:
+            self.cache.move_to_end(index)
+            return self.cache[index]
+
+        start, end = self.spans[index].tolist()
+        lines = [line.strip() for line in self.read(start, end).decode(self.encoding).splitlines()]
+        datum = loads_sentence([line for line in lines if line != self.blank], config=self.Config, sep=self.sep)
+        item = {name: data for data, names in zip(datum, self.groups) for name in names}
+
+        self.cache[index] = item
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+        return item
+
+    def iter_raw(self) -> Iterator[Dict[str, Any]]:
+        with self.path.open(mode='r', encoding=self.encoding) as fp:
+            for datum in iter_sentence(fp, config=self.Config, sep=self.sep, blank=self.blank):
+                yield {name: data for data, names in zip(datum, self.groups) for name in names}
+
+    def columnar_(self) -> 'IndexedDataset':
+        return self
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        return self.process(self.raw(index))
+
+    def __len__(self) -> int:
+        return self.spans.shape[0]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = super(IndexedDataset, self).__getstate__()
+        state['pid'], state['fp'], state['buffer'] = None, None, None
+        return state
+
+
+class IndexedCoNLL2003(IndexedDataset, CoNLL2003):
+    sep = ' '
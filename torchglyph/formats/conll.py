@@ -1,37 +1,64 @@
-from typing import Any, Type, Tuple, NamedTuple, IO, Iterable, get_type_hints
+import functools
+from pathlib import Path
+from typing import Any, Type, Tuple, NamedTuple, IO, Iterable, Callable, List, Optional, get_type_hints
 
 from torchglyph.formats.primitive import loads_type, dumps_type
+from torchglyph.io import iter_range
 
 __all__ = [
-    'loads_token', 'iter_sentence',
+    'compile_config',
+    'loads_token', 'loads_sentence', 'iter_sentence', 'load_sentence_range',
     'dumps_token', 'dump_sentence',
 ]
 
 Token = Tuple[Any, ...]
 Sentence = Tuple[Tuple[Any, ...], ...]
+Schema = Tuple[Tuple[int, Optional[Callable[[str], Any]]], ...]
 
 
-def loads_token(s: str, *, config: Type[NamedTuple], sep: str = '\t') -> Token:
+@functools.lru_cache(maxsize=None)
+def compile_config(config: Type[NamedTuple]) -> Schema:
     return tuple(
-        loads_type(s, tp=tp)
-        for s, (name, tp) in zip(s.strip().split(sep=sep), get_type_hints(config).items())
+        (index, None if tp is str else functools.partial(loads_type, tp=tp))
+        for index, (name, tp) in enumerate(get_type_hints(config).items())
         if not name.endswith('_')
     )
 
 
+def loads_token(s: str, *, config: Type[NamedTuple], sep: str = '\t') -> Token:
+    fields = s.strip().split(sep=sep)
+    return tuple(
+        fields[index] if loads is None else loads(fields[index])
+        for index, loads in compile_config(config)
+    )
+
+
+def loads_sentence(lines: List[str], *, config: Type[NamedTuple], sep: str = '\t') -> Sentence:
+    columns = list(zip(*[line.split(sep) for line in lines]))
+    return tuple(
+        columns[index] if loads is None else tuple(map(loads, columns[index]))
+        for index, loads in compile_config(config)
+    )
+
+
 def iter_sentence(fp: IO, *, config: Type[NamedTuple], sep: str = '\t', blank: str = '') -> Iterable[Sentence]:
-    sentence = []
+    lines = []
 
     for s in fp:
         s = s.strip()
         if s != blank:
-            sentence.append(loads_token(s, config=config, sep=sep))
-        elif len(sentence) != 0:
-            yield tuple(zip(*sentence))
-            sentence = []
+            lines.append(s)
+        elif len(lines) != 0:
+            yield loads_sentence(lines, config=config, sep=sep)
+            lines = []
+
+    if len(lines) != 0:
+        yield loads_sentence(lines, config=config, sep=sep)
+
 
-    if len(sentence) != 0:
-        yield tuple(zip(*sentence))
+def load_sentence_range(path: Path, start: int, end: int, config: Type[NamedTuple],
+                        sep: str = '\t', blank: str = '', encoding: str = 'utf-8') -> List[Sentence]:
+    return list(iter_sentence(iter_range(path, start, end, encoding=encoding), config=config, sep=sep, blank=blank))
 
 
 def dumps_token(token: Token, sep: str = '\t') -> str:
@@ -1,12 +1,23 @@
-from typing import Iterable, List, Tuple, IO
+import itertools
+import logging
+import multiprocessing
+from pathlib import Path
+from typing import Iterable, List, Tuple, IO, Optional, Set
 
+import numpy as np
 from tqdm import tqdm
 
+from torchglyph.io import count_lines, split_ranges, iter_range, is_compressed, open_text
+
+logger = logging.getLogger(__name__)
+
 __all__ = [
     'load_meta',
     'loads_vector',
     'load_vector',
     'iter_vector',
+    'loads_vectors', 'iter_vectors', 'stack_vectors',
+    'load_vector_range', 'load_vector_file',
     'load_word2vec', 'load_glove',
 ]
 
@@ -33,30 +44,157 @@ def iter_vector(fp: IO, *, sep: str = ' ') -> Iterable[Tuple[Token, Vector]]:
     yield from map(lambda s: loads_vector(s, sep=sep), fp)
 
 
-def load_word2vec(fp: IO, *, sep: str = ' ') -> Tuple[List[Token], List[Vector]]:
+def loads_vectors(lines: List[str], *, embedding_dim: int, sep: str = ' ') -> Tuple[List[Token], np.ndarray]:
+    tokens, scalars = [], []
+    for line in lines:
+        token, _, s = line.rstrip().partition(sep)
+        tokens.append(token)
+        scalars.append(s)
+
+    array = np.fromstring(sep.join(scalars), dtype=np.float32, sep=sep)
+    if array.size != len(tokens) * embedding_dim:
+        for token, s in zip(tokens, scalars):
+            size = np.fromstring(s, dtype=np.float32, sep=sep).size
+            assert size == embedding_dim, f'len({token}) = {size} != {embedding_dim}'
+
+    return tokens, array.reshape((len(tokens), embedding_dim))
+
+
+def iter_vectors(fp: Iterable[str], *, embedding_dim: int, sep: str = ' ', keep: Optional[Set[Token]] = None,
+                 chunk_size: int = 4096) -> Iterable[Tuple[List[Token], np.ndarray]]:
+    lines = []
+    for line in fp:
+        if line.strip() != '':
+            if keep is None or line.partition(sep)[0] in keep:
+                lines.append(line)
+        if len(lines) == chunk_size:
+            yield loads_vectors(lines, embedding_dim=embedding_dim, sep=sep)
+            lines = []
+
+    if len(lines) > 0:
+        yield loads_vectors(lines, embedding_dim=embedding_dim, sep=sep)
+
+
+def stack_vectors(chunks: Iterable[Tuple[List[Token], np.ndarray]], *, embedding_dim: int,
+                  num_embeddings: Optional[int] = None) -> Tuple[List[Token], np.ndarray]:
+    tokens = []
+
+    if num_embeddings is None:
+        arrays = [np.empty((0, embedding_dim), dtype=np.float32)]
+        for chunk, vectors in chunks:
+            tokens.extend(chunk)
+            arrays.append(vectors)
+        return tokens, np.concatenate(arrays, axis=0)
+
+    array = np.empty((num_embeddings, embedding_dim), dtype=np.float32)
+    for chunk, vectors in chunks:
+        array[len(tokens):len(tokens) + len(chunk)] = vectors
+        tokens.extend(chunk)
+    return tokens, array[:len(tokens)]
+
+
+def load_vector_range(path: Path, start: int, end: int, *, embedding_dim: int, sep: str = ' ',
+                      keep: Optional[Set[Token]] = None, chunk_size: int = 4096,
+                      num_embeddings: Optional[int] = None) -> Tuple[List[Token], np.ndarray]:
+    chunks = iter_vectors(
+        iter_range(path, start, end),
+        embedding_dim=embedding_dim, sep=sep, keep=keep, chunk_size=chunk_size,
+    )
+
+    if keep is not None:
+        num_embeddings = None
+    elif num_embeddings is None:
+        num_embeddings = count_lines(path, start=start, end=end)
+    return stack_vectors(chunks, embedding_dim=embedding_dim, num_embeddings=num_embeddings)
+
+
+worker_keep: Optional[Set[Token]] = None
+
+
+def init_worker(keep: Optional[Set[Token]]) -> None:
+    global worker_keep
+    worker_keep = keep
+
+
+def load_vector_range_star(args) -> Tuple[List[Token], np.ndarray]:
+    path, start, end, embedding_dim, sep, chunk_size = args
+    return load_vector_range(
+        path, start, end,
+        embedding_dim=embedding_dim, sep=sep, keep=worker_keep, chunk_size=chunk_size,
+    )
+
+
+def load_vector_file(path: Path, *, header: bool, sep: str = ' ', keep: Optional[Set[Token]] = None,
+                     num_workers: int = 0, chunk_size: int = 4096) -> Tuple[List[Token], np.ndarray]:
+    if is_compressed(path):
+        if num_workers > 0:
+            logger.warning(f'{path} is compressed, parsing it serially')
+
+        with open_text(path, encoding='utf-8') as fp:
+            if header:
+                num_embeddings, embedding_dim = load_meta(fp, sep=sep)
+            else:
+                line = next(fp)
+                _, vector = loads_vector(line, sep=sep)
+                num_embeddings, embedding_dim = None, len(vector)
+                fp = itertools.chain([line], fp)
+
+            return stack_vectors(
+                iter_vectors(fp, embedding_dim=embedding_dim, sep=sep, keep=keep, chunk_size=chunk_size),
+                embedding_dim=embedding_dim, num_embeddings=num_embeddings if keep is None else None,
+            )
+
+    with path.open(mode='rb') as fp:
+        if header:
+            num_embeddings, embedding_dim = map(int, fp.readline().decode('utf-8').strip().split(sep))
+            start = fp.tell()
+        else:
+            num_embeddings, start = None, 0
+            _, vector = loads_vector(fp.readline().decode('utf-8'), sep=sep)
+            embedding_dim = len(vector)
+
+    if num_workers <= 0:
+        return load_vector_range(
+            path, start, path.stat().st_size,
+            embedding_dim=embedding_dim, sep=sep, keep=keep, chunk_size=chunk_size,
+            num_embeddings=num_embeddings,
+        )
+
+    if keep is not None:
+        num_embeddings = None
+    elif num_embeddings is None:
+        num_embeddings = count_lines(path, start=start)
+
+    ranges = [
+        (path, begin, end, embedding_dim, sep, chunk_size)
+        for begin, end in split_ranges(path, num_ranges=num_workers * 4, start=start)
+    ]
+    with multiprocessing.Pool(num_workers, initializer=init_worker, initargs=(keep,)) as pool:
+        chunks = tqdm(pool.imap(load_vector_range_star, ranges), total=len(ranges),
+                      desc=f'caching {path}', unit=' ranges')
+        return stack_vectors(chunks, embedding_dim=embedding_dim, num_embeddings=num_embeddings)
+
+
+def load_word2vec(fp: IO, *, sep: str = ' ') -> Tuple[List[Token], np.ndarray]:
     num_embeddings, embedding_dim = load_meta(fp, sep=sep)
     if isinstance(fp, tqdm) and hasattr(fp, 'total'):
         fp.total = num_embeddings
 
-    tokens, vectors = [], []
-    for token, vector in iter_vector(fp, sep=sep):
-        assert len(vector) == embedding_dim, f'len({token}) = {len(vector)} != {embedding_dim}'
-
-        tokens.append(token)
-        vectors.append(vector)
+    tokens, vectors = stack_vectors(
+        iter_vectors(fp, embedding_dim=embedding_dim, sep=sep),
+        embedding_dim=embedding_dim, num_embeddings=num_embeddings,
+    )
 
+    assert len(tokens) == num_embeddings, f'{len(tokens)} != {num_embeddings}'
     return tokens, vectors
 
 
-def load_glove(fp: IO, *, sep: str = ' ') -> Tuple[List[Token], List[Vector]]:
-    token, vector = loads_vector(next(fp), sep=sep)
+def load_glove(fp: IO, *, sep: str = ' ') -> Tuple[List[Token], np.ndarray]:
+    line = next(fp)
+    _, vector = loads_vector(line, sep=sep)
     embedding_dim = len(vector)
 
-    tokens, vectors = [token], [vector]
-    for token, vector in iter_vector(fp, sep=sep):
-        assert len(vector) == embedding_dim, f'len({token}) = {len(vector)} != {embedding_dim}'
-
-        tokens.append(token)
-        vectors.append(vector)
-
-    return tokens, vectors
+    return stack_vectors(
+        iter_vectors(itertools.chain([line], fp), embedding_dim=embedding_dim, sep=sep),
+        embedding_dim=embedding_dim, num_embeddings=None,
+    )
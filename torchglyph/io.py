@@ -1,11 +1,19 @@
+import bz2
 import gzip
+import hashlib
+import io
+import json
 import logging
+import lzma
+import multiprocessing
+import os
 import re
 import shutil
 import tarfile
 import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Union, Pattern, List, Tuple
+from typing import Union, Pattern, List, Tuple, Iterable, Callable, Any, Optional, IO, Dict
 
 import requests
 from requests import Response
@@ -18,6 +26,11 @@ logger = logging.getLogger(__name__)
 __all__ = [
     'toggle_loggers',
     'DownloadMixin', 'download', 'extract',
+    'sha256sum', 'load_manifest', 'verify',
+    'is_archive', 'split_archive', 'is_compressed', 'cache_path',
+    'open_binary', 'open_text',
+    'count_lines', 'line_offsets',
+    'split_ranges', 'split_line_ranges', 'iter_range', 'imap_ranges',
 ]
 
 
@@ -27,18 +40,172 @@ def toggle_loggers(pattern: Union[str, Pattern], enable: bool) -> None:
             logging.getLogger(name).disabled = not enable
 
 
-def download(url: str, path: Path, exist_ok: bool = True, chunk_size: int = 1024 * 1024) -> Path:
-    response: Response = requests.get(url=url, stream=True)
-    assert response.status_code == 200, f'{response.status_code} != {200}'
+MANIFEST = 'manifest.json'
 
-    path.parent.mkdir(parents=True, exist_ok=True)
-    if not path.exists() or not exist_ok:
-        with path.open(mode='wb') as fp:
+
+def sha256sum(path: Path, block_size: int = 1 << 24) -> str:
+    sha256 = hashlib.sha256()
+    with path.open(mode='rb') as fp:
+        for block in iter(lambda: fp.read(block_size), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def load_manifest(root: Path) -> Dict[str, Dict[str, Any]]:
+    path = root / MANIFEST
+    if not path.exists():
+        return {}
+
+    with path.open(mode='r', encoding='utf-8') as fp:
+        return json.load(fp)
+
+
+def update_manifest(path: Path, **kwargs) -> None:
+    manifest = load_manifest(path.parent)
+    stat = path.stat()
+    manifest[path.name] = dict(size=stat.st_size, mtime_ns=stat.st_mtime_ns, **kwargs)
+
+    tmp_path = path.parent / f'{MANIFEST}.{os.getpid()}.tmp'
+    with tmp_path.open(mode='w', encoding='utf-8') as fp:
+        json.dump(manifest, fp, indent=2, sort_keys=True)
+    os.replace(tmp_path, path.parent / MANIFEST)
+
+
+def verify(path: Path, sha256: Optional[str] = None) -> bool:
+    if not path.exists():
+        return False
+
+    stat = path.stat()
+    entry = load_manifest(path.parent).get(path.name, None)
+    if entry is None and sha256 is None:
+        return False
+    if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return sha256 is None or entry['sha256'] == sha256
+
+    logger.info(f'verifying {path}')
+    digest = sha256sum(path)
+    if entry is not None and entry['sha256'] != digest:
+        return False
+    if sha256 is not None and sha256 != digest:
+        return False
+
+    update_manifest(path, sha256=digest, url=None if entry is None else entry.get('url', None))
+    return True
+
+
+def download_stream(url: str, path: Path, ranged: bool, chunk_size: int) -> None:
+    offset = path.stat().st_size if ranged and path.exists() else 0
+    headers = {'Accept-Encoding': 'identity'}
+    if offset > 0:
+        headers['Range'] = f'bytes={offset}-'
+
+    with requests.get(url=url, headers=headers, stream=True) as response:  # type:Response
+        if response.status_code == 416:
+            return
+        if response.status_code == 200:
+            offset = 0
+        else:
+            assert response.status_code == 206, f'{response.status_code} != {206}'
+
+        if offset > 0:
+            logger.info(f'resuming {path} from {offset} bytes')
+
+        with path.open(mode='ab' if offset > 0 else 'wb') as fp:
             for chunk in tqdm(response.iter_content(chunk_size=chunk_size),
-                              total=int(response.headers['Content-Length']) // chunk_size,
+                              total=int(response.headers.get('Content-Length', 0)) // chunk_size,
                               desc=f'downloading from {url}', unit='MB'):
                 fp.write(chunk)
 
+
+def download_part(url: str, path: Path, start: int, end: int, chunk_size: int) -> None:
+    headers = {'Accept-Encoding': 'identity', 'Range': f'bytes={start}-{end - 1}'}
+    with requests.get(url=url, headers=headers, stream=True) as response:
+        assert response.status_code == 206, f'{response.status_code} != {206}'
+
+        with path.open(mode='r+b') as fp:
+            fp.seek(start)
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                fp.write(chunk)
+
+
+def download_parts(url: str, path: Path, size: int, part_size: int, chunk_size: int, num_workers: int) -> None:
+    state_path = path.with_name(f'{path.name}.json')
+
+    done = set()
+    if path.exists() and state_path.exists():
+        with state_path.open(mode='r', encoding='utf-8') as fp:
+            state = json.load(fp)
+        if state['size'] == size and state['part_size'] == part_size:
+            done = set(state['done'])
+
+    if len(done) == 0:
+        with path.open(mode='wb') as fp:
+            fp.truncate(size)
+    else:
+        logger.info(f'resuming {path} from {len(done)} parts')
+
+    parts = [
+        (index, start, min(start + part_size, size))
+        for index, start in enumerate(range(0, size, part_size)) if index not in done
+    ]
+    with ThreadPoolExecutor(max_workers=num_workers) as pool:
+        futures = {
+            pool.submit(download_part, url, path, start, end, chunk_size): index
+            for index, start, end in parts
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc=f'downloading from {url}', unit=' parts'):
+            future.result()
+            done.add(futures[future])
+            with state_path.open(mode='w', encoding='utf-8') as fp:
+                json.dump(dict(size=size, part_size=part_size, done=sorted(done)), fp)
+
+    state_path.unlink()
+
+
+def download(url: str, path: Path, exist_ok: bool = True, chunk_size: int = 1024 * 1024,
+             num_workers: int = 0, part_size: int = 1 << 26, sha256: Optional[str] = None) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if exist_ok and verify(path, sha256=sha256):
+        return path
+
+    size, ranged = None, False
+    response: Response = requests.head(url=url, headers={'Accept-Encoding': 'identity'}, allow_redirects=True)
+    if response.status_code == 200:
+        ranged = response.headers.get('Accept-Ranges', 'none') == 'bytes'
+        if 'Content-Length' in response.headers:
+            size = int(response.headers['Content-Length'])
+
+    if exist_ok and path.exists() and path.stat().st_size == size:
+        digest = sha256sum(path)
+        if sha256 is None or digest == sha256:
+            update_manifest(path, sha256=digest, url=url)
+            return path
+
+    part_path = path.with_name(f'{path.name}.part')
+    state_path = part_path.with_name(f'{part_path.name}.json')
+    if num_workers > 1 and ranged and size is not None and size > part_size:
+        download_parts(
+            url=url, path=part_path, size=size, part_size=part_size,
+            chunk_size=chunk_size, num_workers=num_workers,
+        )
+    else:
+        if state_path.exists():
+            # a preallocated part file of parallel download has holes, it can not be resumed as a stream
+            logger.info(f'discarding {part_path}')
+            part_path.unlink(missing_ok=True)
+            state_path.unlink()
+        download_stream(url=url, path=part_path, ranged=ranged, chunk_size=chunk_size)
+
+    if size is not None and part_path.stat().st_size != size:
+        raise IOError(f'{part_path} has {part_path.stat().st_size} bytes, expected {size}')
+    os.replace(part_path, path)
+
+    digest = sha256sum(path)
+    if sha256 is not None and digest != sha256:
+        path.unlink()
+        raise IOError(f'sha256 of {url} is {digest}, expected {sha256}')
+
+    update_manifest(path, sha256=digest, url=url)
     return path
 
 
@@ -84,6 +251,148 @@ def extract(path: Path) -> Path:
     return path
 
 
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tgz')
+STREAM_SUFFIXES = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+
+def is_archive(path: Path) -> bool:
+    return path.suffix in ARCHIVE_SUFFIXES or path.suffixes[-2:] == ['.tar', '.gz']
+
+
+def split_archive(path: Path) -> Tuple[Path, Optional[str]]:
+    for archive in path.parents:
+        if is_archive(archive) and not archive.is_dir():
+            return archive, path.relative_to(archive).as_posix()
+    return path, None
+
+
+def is_compressed(path: Path) -> bool:
+    archive, member = split_archive(path)
+    return member is not None or path.suffix in STREAM_SUFFIXES
+
+
+def cache_path(path: Path) -> Path:
+    archive, member = split_archive(path)
+    if member is not None:
+        return archive.parent / member
+    if path.suffix in STREAM_SUFFIXES:
+        return path.with_suffix('')
+    return path
+
+
+def open_binary(path: Path, buffer_size: int = 1 << 24) -> IO[bytes]:
+    archive, member = split_archive(path)
+
+    if member is not None:
+        if archive.suffix == '.zip':
+            fp = zipfile.ZipFile(archive, mode='r').open(member, mode='r')
+        else:
+            fp = tarfile.open(archive, mode='r:*').extractfile(member)
+            if fp is None:
+                raise FileNotFoundError(f'{member} is not a regular file in {archive}')
+        return io.BufferedReader(fp, buffer_size=buffer_size)
+
+    if path.suffix in STREAM_SUFFIXES:
+        return io.BufferedReader(STREAM_SUFFIXES[path.suffix](path, mode='rb'), buffer_size=buffer_size)
+
+    return path.open(mode='rb', buffering=buffer_size)
+
+
+def open_text(path: Path, encoding: str = 'utf-8', buffer_size: int = 1 << 24) -> IO[str]:
+    return io.TextIOWrapper(open_binary(path, buffer_size=buffer_size), encoding=encoding)
+
+
+def count_lines(path: Path, start: int = 0, end: int = None, block_size: int = 1 << 24) -> int:
+    count, last = 0, b'\n'
+    with path.open(mode='rb') as fp:
+        fp.seek(start)
+        remaining = float('inf') if end is None else end - start
+        while remaining > 0:
+            block = fp.read(int(min(block_size, remaining)))
+            if len(block) == 0:
+                break
+            count += block.count(b'\n')
+            remaining -= len(block)
+            last = block[-1:]
+
+    return count + (last != b'\n')
+
+
+def line_offsets(path: Path, lines: List[int], block_size: int = 1 << 24) -> List[int]:
+    offsets, index, count, position = [], 0, 0, 0
+
+    with path.open(mode='rb') as fp:
+        while index < len(lines):
+            block = fp.read(block_size)
+            if len(block) == 0:
+                break
+
+            start = 0
+            while index < len(lines) and count + block.count(b'\n', start) >= lines[index]:
+                while count < lines[index]:
+                    start = block.find(b'\n', start) + 1
+                    count += 1
+                offsets.append(position + start)
+                index += 1
+
+            count += block.count(b'\n', start)
+            position += len(block)
+
+    return offsets + [position] * (len(lines) - len(offsets))
+
+
+def split_ranges(path: Path, num_ranges: int, start: int = 0, blank: bool = False) -> List[Tuple[int, int]]:
+    size = path.stat().st_size
+    step = max(1, (size - start + num_ranges - 1) // num_ranges)
+
+    offsets = [start]
+    with path.open(mode='rb') as fp:
+        while offsets[-1] + step < size:
+            fp.seek(offsets[-1] + step)
+            fp.readline()
+            while blank and fp.tell() < size and fp.readline().strip() != b'':
+                pass
+            if fp.tell() >= size:
+                break
+            offsets.append(fp.tell())
+
+    return list(zip(offsets, offsets[1:] + [size]))
+
+
+def split_line_ranges(src_path: Path, tgt_path: Path, num_ranges: int) -> List[Tuple[int, int, int, int]]:
+    src_ranges = split_ranges(src_path, num_ranges=num_ranges)
+
+    lines = [0]
+    for start, end in src_ranges[:-1]:
+        lines.append(lines[-1] + count_lines(src_path, start=start, end=end))
+    offsets = line_offsets(tgt_path, lines=lines)
+    tgt_ranges = zip(offsets, offsets[1:] + [tgt_path.stat().st_size])
+
+    return [(*src_range, *tgt_range) for src_range, tgt_range in zip(src_ranges, tgt_ranges)]
+
+
+def iter_range(path: Path, start: int, end: int, encoding: str = 'utf-8') -> Iterable[str]:
+    with path.open(mode='rb') as fp:
+        fp.seek(start)
+        while start < end:
+            line = fp.readline()
+            if len(line) == 0:
+                break
+            start += len(line)
+            yield line.decode(encoding)
+
+
+def apply_range(args: Tuple[Callable[..., List[Any]], Tuple[Any, ...]]) -> List[Any]:
+    fn, args = args
+    return fn(*args)
+
+
+def imap_ranges(fn: Callable[..., List[Any]], ranges: List[Tuple[Any, ...]], num_workers: int) -> Iterable[Any]:
+    with multiprocessing.Pool(num_workers) as pool:
+        for items in pool.imap(apply_range, [(fn, args) for args in ranges]):
+            yield from items
+
+
 class DownloadMixin(object):
     name: str
     urls: List[Tuple[str, ...]]
@@ -93,15 +402,29 @@ class DownloadMixin(object):
         return cls.urls
 
     @classmethod
-    def paths(cls, root: Path = data_dir, **kwargs) -> List[Path]:
+    def paths(cls, root: Path = data_dir, decompress: bool = True, download_workers: int = 8,
+              **kwargs) -> List[Path]:
         root = root / getattr(cls, 'name', cls.__name__).lower()
 
         paths = []
         for url, path, *names in cls.get_urls(**kwargs):
             if len(names) == 0:
                 names = [path]
+
+            if not decompress and path not in names:
+                if any(not (root / name).exists() for name in names):
+                    download(url=url, path=root / path, exist_ok=True, num_workers=download_workers)
+                for name in names:
+                    if (root / name).exists():
+                        paths.append(root / name)
+                    elif is_archive(root / path):
+                        paths.append(root / path / name)
+                    else:
+                        paths.append(root / path)
+                continue
+
             if any(not (root / name).exists() for name in names):
-                extract(path=download(url=url, path=root / path, exist_ok=False))
+                extract(path=download(url=url, path=root / path, exist_ok=True, num_workers=download_workers))
             for name in names:
                 if not (root / name).exists():
                     raise FileNotFoundError(f'{root / name} is not obtainable from {url}')
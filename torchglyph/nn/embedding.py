@@ -23,13 +23,23 @@ class TokenEmbedding(nn.Embedding, metaclass=RuaMeta):
     def __init__(self, embedding_dim: int, freeze: bool = False, *, vocab: Vocab = None,
                  num_embeddings: int = 0, padding_idx: int = None,
                  dtype: torch.dtype = torch.float32) -> None:
+        weight, scales, compact = None, None, False
+        if vocab is not None and vocab.vectors is not None:
+            weight, scales = vocab.vectors, vocab.scales
+            if not freeze and (scales is not None or weight.dtype != dtype):
+                weight, scales = vocab.dequantize(dtype=dtype), None
+            compact = weight.dtype != dtype
+
         if vocab is not None:
             super(TokenEmbedding, self).__init__(
                 embedding_dim=embedding_dim,
                 num_embeddings=len(vocab),
                 padding_idx=vocab.pad_idx,
-                _weight=vocab.vectors, dtype=dtype,
+                _weight=None if compact else weight,
+                device='meta' if compact else None, dtype=dtype,
             )
+            if compact:
+                self.weight = nn.Parameter(weight, requires_grad=False)
         else:
             super(TokenEmbedding, self).__init__(
                 embedding_dim=embedding_dim,
@@ -39,8 +49,13 @@ class TokenEmbedding(nn.Embedding, metaclass=RuaMeta):
             )
         self.weight.requires_grad = not freeze
 
+        self.dtype = dtype
+        self.register_buffer('scales', scales)
+
     def extra_repr(self) -> str:
         args = [super(TokenEmbedding, self).extra_repr()]
+        if self.weight.dtype != self.dtype:
+            args.append(f'{self.weight.dtype}')
         if not self.weight.requires_grad:
             args.append('frozen')
         return ', '.join(args)
@@ -49,6 +64,15 @@ class TokenEmbedding(nn.Embedding, metaclass=RuaMeta):
     def padding_mask(self, indices: Tensor) -> Tensor:
         return indices == (self.padding_idx if self.padding_idx is None else -100)
 
+    def forward(self, indices: Tensor) -> Tensor:
+        if self.weight.dtype == self.dtype:
+            return super(TokenEmbedding, self).forward(indices)
+
+        embedding = self.weight[indices].to(dtype=self.dtype)
+        if self.scales is not None:
+            embedding = embedding * self.scales[indices][..., None].to(dtype=self.dtype)
+        return embedding
+
 
 class CharLstmEmbedding(nn.Module):
     def __init__(self, hidden_dim: int = 50, num_layers: int = 1,
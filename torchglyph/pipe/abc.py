@@ -1,14 +1,55 @@
+import multiprocessing
 from abc import ABCMeta
 from collections import Counter
-from typing import Optional, Union, List, Any, Tuple
+from contextlib import contextmanager
+from multiprocessing.pool import Pool
+from typing import Optional, Union, List, Any, Tuple, Dict, Iterable, Iterator
 
-from torchglyph.proc import Proc, Processors, compress, subs, Identity
+from torch.types import Device
+
+from torchglyph.proc import Proc, Processors, compress, subs, iter_procs, Identity
+from torchglyph.stream import StreamMixin
 from torchglyph.vocab import Vocab
 
 __all__ = [
     'Pipe', 'RawPipe',
+    'process_pool',
 ]
 
+worker_pipes: Dict[int, 'Pipe'] = {}
+
+
+def init_worker(pipes: Dict[int, 'Pipe']) -> None:
+    global worker_pipes
+    worker_pipes = pipes
+
+
+@contextmanager
+def process_pool(pipes: Iterable['Pipe'], num_workers: int) -> Iterator[Optional[Pool]]:
+    if num_workers <= 0:
+        yield None
+        return
+
+    pipes = {id(pipe): pipe for pipe in pipes}
+    with multiprocessing.Pool(num_workers, initializer=init_worker, initargs=(pipes,)) as pool:
+        yield pool
+
+
+def preprocess_shard(key: int, data: List[Any], name: str) -> Tuple[List[Any], Counter]:
+    counter, pipe = Counter(), worker_pipes[key]
+    return [pipe.pre_proc(datum, counter=counter, name=name) for datum in data], counter
+
+
+def postprocess_shard(key: int, data: List[Any], name: str) -> List[Any]:
+    pipe = worker_pipes[key]
+    return [pipe.post_proc(datum, vocab=pipe.vocab, name=name) for datum in data]
+
+
+def split_shards(data: List[Any], num_shards: int) -> List[List[Any]]:
+    data = list(data)
+    shard_size = max(1, (len(data) + num_shards - 1) // num_shards)
+    return [data[index:index + shard_size] for index in range(0, len(data), shard_size)]
+
 
 class Pipe(object, metaclass=ABCMeta):
     def __init__(self, pre: Processors = None, vocab: Processors = None,
@@ -41,50 +82,97 @@ class Pipe(object, metaclass=ABCMeta):
     def __repr__(self) -> str:
         return f'{self.__class__.__name__}(\n  {self.extra_repr()}\n)'
 
-    def preprocess_(self, *datasets, counter: Optional[Counter] = None) -> Counter:
+    @property
+    def device(self) -> Device:
+        device = None
+        for proc in iter_procs(self.batch_proc):
+            if getattr(proc, 'device', None) is not None:
+                device = proc.device
+
+        return device
+
+    def preprocess_column(self, data: List[Any], *, counter: Counter, name: str,
+                          num_workers: int = 0, pool: Optional[Pool] = None) -> List[Any]:
+        if num_workers <= 0:
+            return [self.pre_proc(datum, counter=counter, name=name) for datum in data]
+
+        if pool is None:
+            with process_pool([self], num_workers=num_workers) as pool:
+                return self.preprocess_column(data, counter=counter, name=name, num_workers=num_workers, pool=pool)
+
+        out = []
+        shards = [(id(self), shard, name) for shard in split_shards(data, num_shards=num_workers)]
+        for shard, shard_counter in pool.starmap(preprocess_shard, shards):
+            out.extend(shard)
+            counter.update(shard_counter)
+
+        return out
+
+    def postprocess_column(self, data: List[Any], *, name: str,
+                           num_workers: int = 0, pool: Optional[Pool] = None) -> List[Any]:
+        if num_workers <= 0:
+            return [self.post_proc(datum, vocab=self.vocab, name=name) for datum in data]
+
+        if pool is None:
+            with process_pool([self], num_workers=num_workers) as pool:
+                return self.postprocess_column(data, name=name, num_workers=num_workers, pool=pool)
+
+        out = []
+        shards = [(id(self), shard, name) for shard in split_shards(data, num_shards=num_workers)]
+        for shard in pool.starmap(postprocess_shard, shards):
+            out.extend(shard)
+
+        return out
+
+    def preprocess_(self, *datasets, counter: Optional[Counter] = None,
+                    num_workers: int = 0, pool: Optional[Pool] = None) -> Counter:
         if counter is None:
             counter = Counter()
 
         if not isinstance(self.pre_proc, Identity):
             for dataset in datasets:
                 for name, pipe in dataset.pipes.items():
-                    if self is pipe:
+                    if self is pipe and isinstance(dataset, StreamMixin):
+                        for item in dataset.iter_raw():
+                            self.pre_proc(item[name], counter=counter, name=name)
+                    elif self is pipe:
                         todo = f'{name}_pre_todo'
                         if getattr(dataset, todo, True):
-                            dataset.data[name] = [
-                                self.pre_proc(datum, counter=counter, name=name)
-                                for datum in dataset.data[name]
-                            ]
+                            dataset.data[name] = self.preprocess_column(
+                                dataset.data[name], counter=counter,
+                                name=name, num_workers=num_workers, pool=pool,
+                            )
                             setattr(dataset, todo, False)
 
         return counter
 
-    def postprocess_(self, *datasets) -> 'Pipe':
-        _ = self.preprocess_(*datasets)
+    def postprocess_(self, *datasets, num_workers: int = 0, pool: Optional[Pool] = None) -> 'Pipe':
+        _ = self.preprocess_(*datasets, num_workers=num_workers, pool=pool)
 
         if not isinstance(self.post_proc, Identity):
             for dataset in datasets:
                 for name, pipe in dataset.pipes.items():
-                    if self is pipe:
+                    if self is pipe and not isinstance(dataset, StreamMixin):
                         todo = f'{name}_post_todo'
                         if getattr(dataset, todo, True):
-                            dataset.data[name] = [
-                                self.post_proc(datum, vocab=self.vocab, name=name)
-                                for datum in dataset.data[name]
-                            ]
+                            dataset.data[name] = self.postprocess_column(
+                                dataset.data[name],
+                                name=name, num_workers=num_workers, pool=pool,
+                            )
                             setattr(dataset, todo, False)
 
         return self
 
     def build_vocab_(self, *datasets, special_tokens: Tuple[str, ...] = (),
-                     max_size: Optional[int] = None, min_freq: int = 1) -> 'Pipe':
+                     max_size: Optional[int] = None, min_freq: int = 1,
+                     num_workers: int = 0, pool: Optional[Pool] = None) -> 'Pipe':
         name = ', '.join(sorted(list(set([
             name for dataset in datasets
             for name, pipe in dataset.pipes.items() if self is pipe
         ]))))
 
         self.vocab = self.vocab_proc(
-            self.preprocess_(*datasets),
+            self.preprocess_(*datasets, num_workers=num_workers, pool=pool),
             name=f'[{name}]' if ', ' in name else name,
             special_tokens=special_tokens,
             max_size=max_size, min_freq=min_freq,
@@ -99,8 +187,8 @@ class Pipe(object, metaclass=ABCMeta):
         batch = [self.post_proc(datum, vocab=vocab, name=name) for datum in data]
         return self.batch_proc(batch, vocab=vocab, name=name), vocab
 
-    def collate_fn(self, batch: List[Any]) -> Any:
-        return self.batch_proc(batch, vocab=self.vocab)
+    def collate_fn(self, batch: List[Any], **kwargs) -> Any:
+        return self.batch_proc(batch, vocab=self.vocab, **kwargs)
 
 
 class RawPipe(Pipe):
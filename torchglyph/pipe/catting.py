@@ -1,13 +1,15 @@
+from multiprocessing.pool import Pool
 from typing import List, Tuple, Optional
 
 import torch
+from torch import Tensor
 from torch.types import Device, Number
 from torchrua import CattedSequence
 
 from torchglyph.pipe.abc import Pipe
 from torchglyph.proc.catting import CatSequence
 from torchglyph.proc.collating import ToTensor
-from torchglyph.proc.vocab import UpdateCounter, BuildVocab, Numbering, StatsVocab
+from torchglyph.proc.vocab import UpdateCounter, BuildVocab, Numbering, StatsVocab, numbering_list
 
 __all__ = [
     'CattedNumListPipe',
@@ -51,6 +53,16 @@ class CattedStrListPipe(CattedNumListPipe):
             ],
             post=Numbering() + ...,
         )
+        self.dtype = dtype
+        self.numbering_proc = self.post_proc
+
+    def postprocess_column(self, data: List[List[str]], *, name: str,
+                           num_workers: int = 0, pool: Optional[Pool] = None) -> List[Tensor]:
+        if self.post_proc is not self.numbering_proc:
+            return super(CattedStrListPipe, self).postprocess_column(
+                data, name=name, num_workers=num_workers, pool=pool,
+            )
+        return numbering_list(data, vocab=self.vocab, dtype=self.dtype)
 
     def inv(self, sequence: CattedSequence) -> List[List[str]]:
         assert sequence.data.dim() == 1, f'{sequence.data.dim()} != 1'
@@ -1,8 +1,11 @@
-from typing import Tuple, List
+from multiprocessing.pool import Pool
+from typing import Tuple, List, Optional
 
 import torch
+from torch import Tensor
 from torch.nn.utils.rnn import PackedSequence
 from torch.types import Device, Number
+from torchrua import CattedSequence
 from torchrua.padding import pad_packed_sequence
 
 from torchglyph.pipe.abc import Pipe
@@ -12,6 +15,7 @@ from torchglyph.proc.catting import CatSequence
 from torchglyph.proc.collating import ToTensor
 from torchglyph.proc.packing import PackSequence, ComposeCattedSequences
 from torchglyph.proc.vocab import UpdateCounter, BuildVocab, StatsVocab, Numbering
+from torchglyph.proc.vocab import numbering_list, numbering_list_list
 
 __all__ = [
     'PackedNumListPipe', 'PackedNumListListPipe',
@@ -52,6 +56,16 @@ class PackedStrListPipe(PackedNumListPipe):
             ],
             post=Numbering() + ...,
         )
+        self.dtype = dtype
+        self.numbering_proc = self.post_proc
+
+    def postprocess_column(self, data: List[List[str]], *, name: str,
+                           num_workers: int = 0, pool: Optional[Pool] = None) -> List[Tensor]:
+        if self.post_proc is not self.numbering_proc:
+            return super(PackedStrListPipe, self).postprocess_column(
+                data, name=name, num_workers=num_workers, pool=pool,
+            )
+        return numbering_list(data, vocab=self.vocab, dtype=self.dtype)
 
     def inv(self, sequence: PackedSequence) -> List[List[str]]:
         assert sequence.data.dim() == 1, f'{sequence.data.dim()} != 1'
@@ -85,3 +99,13 @@ class PackedStrListListPipe(PackedNumListListPipe):
             ],
             post=Lift(Numbering()) + ...,
         )
+        self.dtype = dtype
+        self.numbering_proc = self.post_proc
+
+    def postprocess_column(self, data: List[List[List[str]]], *, name: str,
+                           num_workers: int = 0, pool: Optional[Pool] = None) -> List[CattedSequence]:
+        if self.post_proc is not self.numbering_proc:
+            return super(PackedStrListListPipe, self).postprocess_column(
+                data, name=name, num_workers=num_workers, pool=pool,
+            )
+        return numbering_list_list(data, vocab=self.vocab, dtype=self.dtype)
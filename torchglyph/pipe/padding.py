@@ -1,4 +1,5 @@
-from typing import Tuple, List
+from multiprocessing.pool import Pool
+from typing import Tuple, List, Optional
 
 import torch
 from torch import Tensor
@@ -7,7 +8,7 @@ from torch.types import Device, Number
 from torchglyph.pipe.abc import Pipe
 from torchglyph.proc.collating import ToTensor, ToDevice
 from torchglyph.proc.padding import PadSequence
-from torchglyph.proc.vocab import UpdateCounter, BuildVocab, StatsVocab, Numbering
+from torchglyph.proc.vocab import UpdateCounter, BuildVocab, StatsVocab, Numbering, numbering_list
 
 __all__ = [
     'PaddedNumPipe', 'PaddedNumListPipe',
@@ -85,6 +86,16 @@ class PaddedStrListPipe(PaddedNumListPipe):
             ],
             post=Numbering() + ...,
         )
+        self.dtype = dtype
+        self.numbering_proc = self.post_proc
+
+    def postprocess_column(self, data: List[List[str]], *, name: str,
+                           num_workers: int = 0, pool: Optional[Pool] = None) -> List[Tensor]:
+        if self.post_proc is not self.numbering_proc:
+            return super(PaddedStrListPipe, self).postprocess_column(
+                data, name=name, num_workers=num_workers, pool=pool,
+            )
+        return numbering_list(data, vocab=self.vocab, dtype=self.dtype)
 
     def inv(self, data: Tensor, token_sizes: Tensor) -> List[List[str]]:
         assert data.dim() == 2, f'{data.dim()} != 2'
@@ -1,8 +1,8 @@
 from abc import ABCMeta, abstractmethod
-from typing import Optional, Union, Any, List, Set, Tuple
+from typing import Optional, Union, Any, List, Set, Tuple, Iterator
 
 __all__ = [
-    'compress', 'subs',
+    'compress', 'subs', 'iter_procs',
     'Proc', 'Processors',
     'Identity', 'Lift', 'Chain',
     'Map', 'Filter',
@@ -30,6 +30,14 @@ def subs(processors: Processors, repl: Processors) -> Processors:
     return [repl if proc is ... else proc for proc in compress(processors, allow_ellipsis=True)]
 
 
+def iter_procs(processors: Processors) -> Iterator['Proc']:
+    for proc in compress(processors, allow_ellipsis=False):
+        if isinstance(proc, Lift):
+            yield from iter_procs(proc.proc)
+        else:
+            yield proc
+
+
 class Proc(object, metaclass=ABCMeta):
     @classmethod
     def from_list(cls, processors: List['Proc']) -> 'Proc':
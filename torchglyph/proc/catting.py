@@ -24,18 +24,21 @@ class CattingProc(Proc, metaclass=ABCMeta):
     def extra_repr(self) -> str:
         return f'device={self.device}'
 
+    def get_device(self, **kwargs) -> Device:
+        return kwargs.get('device', self.device)
+
     def __call__(self, data: Any, **kwargs) -> CattedSequence:
         raise NotImplementedError
 
 
 class CatSequence(CattingProc):
     def __call__(self, data: List[Tensor], **kwargs) -> CattedSequence:
-        return cat_sequence(sequences=data, device=self.device)
+        return cat_sequence(sequences=data, device=self.get_device(**kwargs))
 
 
 class CatPackedSequence(CattingProc):
     def __call__(self, data: PackedSequence, **kwargs) -> CattedSequence:
-        return cat_packed_sequence(sequence=data, device=self.device)
+        return cat_packed_sequence(sequence=data, device=self.get_device(**kwargs))
 
 
 class CatPaddedSequence(CattingProc):
@@ -53,5 +56,5 @@ class CatPaddedSequence(CattingProc):
         data, token_sizes = data
         return cat_padded_sequence(
             sequence=data, token_sizes=token_sizes,
-            batch_first=self.batch_first, device=self.device,
+            batch_first=self.batch_first, device=self.get_device(**kwargs),
         )
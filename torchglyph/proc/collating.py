@@ -42,16 +42,25 @@ class ToTensor(Proc):
 class ToDevice(Proc):
     Tensors = Union[Tensor, PackedSequence, Set[Tensor], List[Tensor], Tuple[Tensor, ...]]
 
-    def __init__(self, device: Device = None) -> None:
+    def __init__(self, device: Device = None, non_blocking: bool = False) -> None:
         super(ToDevice, self).__init__()
         self.device = device
+        self.non_blocking = non_blocking
 
     def extra_repr(self) -> str:
+        if self.non_blocking:
+            return f'{self.device}, non_blocking'
         return f'{self.device}'
 
     def __call__(self, tensors: Tensors, **kwargs) -> Tensors:
+        device = kwargs.get('device', self.device)
+        if device is None:
+            return tensors
+
         if isinstance(tensors, (Tensor, PackedSequence)):
-            return tensors.to(device=self.device)
+            return tensors.to(device=device, non_blocking=self.non_blocking)
+        if isinstance(tensors, tuple) and hasattr(tensors, '_fields'):
+            return type(tensors)(*[self(tensor, **kwargs) for tensor in tensors])
         if isinstance(tensors, (set, list, tuple)):
             return type(tensors)([self(tensor, **kwargs) for tensor in tensors])
         return tensors
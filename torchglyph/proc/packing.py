@@ -29,23 +29,27 @@ class PackingProc(Proc, metaclass=ABCMeta):
     def extra_repr(self) -> str:
         return f'device={self.device}'
 
+    def get_device(self, **kwargs) -> Device:
+        return kwargs.get('device', self.device)
+
     def __call__(self, data: Any, **kwargs) -> PackedSequence:
         raise NotImplementedError
 
 
 class PackSequence(PackingProc):
     def __call__(self, data: List[Tensor], **kwargs) -> PackedSequence:
-        return pack_sequence(sequences=data, device=self.device)
+        return pack_sequence(sequences=data, device=self.get_device(**kwargs))
 
 
 class PackCattedSequence(PackingProc):
     def __call__(self, data: List[CattedSequence], **kwargs) -> PackedSequence:
         data, token_sizes = data
+        device = self.get_device(**kwargs)
 
-        if self.device is not None:
-            data = data.to(device=self.device)
-            token_sizes = token_sizes.to(device=self.device)
-        return pack_catted_sequence(sequence=data, token_sizes=token_sizes, device=self.device)
+        if device is not None:
+            data = data.to(device=device)
+            token_sizes = token_sizes.to(device=device)
+        return pack_catted_sequence(sequence=data, token_sizes=token_sizes, device=device)
 
 
 class PackPaddedSequence(PackingProc):
@@ -61,18 +65,19 @@ class PackPaddedSequence(PackingProc):
 
     def __call__(self, data: List[PaddedSequence], **kwargs) -> PackedSequence:
         data, token_sizes = data
+        device = self.get_device(**kwargs)
 
         return pack_padded_sequence(
-            sequence=data.to(device=self.device),
-            token_sizes=token_sizes.to(device=self.device),
-            batch_first=self.batch_first, device=self.device,
+            sequence=data.to(device=device),
+            token_sizes=token_sizes.to(device=device),
+            batch_first=self.batch_first, device=device,
         )
 
 
 class ToPackedPtrSequence(PackingProc):
     @torch.no_grad()
     def __call__(self, data: PackedSequence, **kwargs) -> PackedSequence:
-        device = self.device
+        device = self.get_device(**kwargs)
         if device is None:
             device = data.data.device
 
@@ -92,4 +97,4 @@ class ToPackedPtrSequence(PackingProc):
 
 class ComposeCattedSequences(PackingProc):
     def __call__(self, data: List[CattedSequence], **kwargs) -> PackedSequence:
-        return compose_catted_sequences(sequences=data, device=self.device)
+        return compose_catted_sequences(sequences=data, device=self.get_device(**kwargs))
@@ -31,6 +31,9 @@ class PaddingProc(Proc, metaclass=ABCMeta):
             f'device={self.device}',
         ])
 
+    def get_device(self, **kwargs) -> Device:
+        return kwargs.get('device', self.device)
+
     def __call__(self, data: Any, **kwargs) -> Tensor:
         raise NotImplementedError
 
@@ -39,7 +42,7 @@ class PadSequence(PaddingProc):
     def __call__(self, data: List[Tensor], **kwargs) -> Tensor:
         sequence, _ = pad_sequence(
             sequences=data, batch_first=self.batch_first,
-            padding_value=self.padding_value, device=self.device,
+            padding_value=self.padding_value, device=self.get_device(**kwargs),
         )
         return sequence
 
@@ -48,7 +51,7 @@ class PadPackedSequence(PaddingProc):
     def __call__(self, data: PackedSequence, **kwargs) -> Tensor:
         data, _ = pad_packed_sequence(
             sequence=data, batch_first=self.batch_first,
-            padding_value=self.padding_value, device=self.device,
+            padding_value=self.padding_value, device=self.get_device(**kwargs),
         )
         return data
 
@@ -57,6 +60,6 @@ class PadCattedSequence(PaddingProc):
     def __call__(self, data: CattedSequence, **kwargs) -> Tensor:
         sequence, _ = pad_catted_sequence(
             sequence=data, batch_first=self.batch_first,
-            padding_value=self.padding_value, device=self.device,
+            padding_value=self.padding_value, device=self.get_device(**kwargs),
         )
         return sequence
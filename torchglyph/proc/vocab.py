@@ -1,7 +1,11 @@
-import heapq
+import itertools
 import logging
 from collections import Counter
-from typing import Tuple, Optional
+from typing import Tuple, Optional, List
+
+import numpy as np
+import torch
+from torchrua import CattedSequence
 
 from torchglyph.proc.abc import Proc, Map
 from torchglyph.vocab import Vocab, Vectors, Glove, FastText
@@ -9,11 +13,34 @@ from torchglyph.vocab import Vocab, Vectors, Glove, FastText
 logger = logging.getLogger(__name__)
 
 __all__ = [
+    'numbering_list', 'numbering_list_list',
     'UpdateCounter', 'Numbering', 'BuildVocab', 'StatsVocab',
     'LoadVectors', 'LoadGlove', 'LoadFastText',
 ]
 
 
+def numbering_list(data: List[List[str]], *, vocab: Vocab, dtype: torch.dtype = None) -> List[torch.Tensor]:
+    token_sizes = [len(datum) for datum in data]
+    indices = vocab.lookup_many(itertools.chain.from_iterable(data), count=sum(token_sizes))
+
+    tensor = torch.from_numpy(indices)
+    if dtype is not None:
+        tensor = tensor.to(dtype=dtype)
+
+    return list(torch.split(tensor, token_sizes, dim=0))
+
+
+def numbering_list_list(data: List[List[List[str]]], *, vocab: Vocab,
+                        dtype: torch.dtype = None) -> List[CattedSequence]:
+    token_sizes = torch.tensor([len(token) for datum in data for token in datum], dtype=torch.long)
+    sentences = numbering_list([list(itertools.chain.from_iterable(datum)) for datum in data], vocab=vocab, dtype=dtype)
+
+    return [
+        CattedSequence(data=sentence, token_sizes=sizes)
+        for sentence, sizes in zip(sentences, torch.split(token_sizes, [len(datum) for datum in data], dim=0))
+    ]
+
+
 class UpdateCounter(Map):
     def map(self, token: str, *, counter: Counter, **kwargs) -> str:
         counter[token] += 1
@@ -56,22 +83,22 @@ class StatsVocab(Proc):
         return f'{self.threshold}'
 
     def __call__(self, vocab: Vocab, name: str, *args, **kwargs) -> Vocab:
-        num_tokens = len(vocab.freq)
-        avg_freq = sum(vocab.freq.values()) / max(1, num_tokens)
+        order = np.argsort(-vocab.counts, kind='stable')
+        order = order[vocab.counts[order] > 0]
+
+        num_tokens = order.shape[0]
+        avg_freq = vocab.counts.sum() / max(1, num_tokens)
 
         if num_tokens <= self.threshold:
-            xs = vocab.freq.most_common()
-            xs = ', '.join([f"'{token}'({freq})" for token, freq in xs])
+            xs = ', '.join([f"'{vocab.itos[index]}'({vocab.counts[index]})" for index in order.tolist()])
 
             logger.info(f"{name}.vocab => {vocab} :: {avg_freq:.1f} times/token")
             logger.info(f"{name}.tokens => [{xs}]")
 
         else:
             n, m = self.threshold // 2, (self.threshold + 1) // 2
-            xs = heapq.nlargest(n, vocab.freq.items(), key=lambda x: x[1])
-            ys = heapq.nsmallest(m, vocab.freq.items(), key=lambda x: x[1])
-            xs = ', '.join([f"'{token}'({freq})" for token, freq in xs])
-            ys = ', '.join([f"'{token}'({freq})" for token, freq in ys[::-1]])
+            xs = ', '.join([f"'{vocab.itos[index]}'({vocab.counts[index]})" for index in order[:n].tolist()])
+            ys = ', '.join([f"'{vocab.itos[index]}'({vocab.counts[index]})" for index in order[-m:].tolist()])
 
             logger.info(f"{name}.vocab => {vocab} :: {avg_freq:.1f} times/token")
             logger.info(f"{name}.tokens => [{xs}, ..., {ys}]")
@@ -80,39 +107,83 @@ class StatsVocab(Proc):
 
 
 class LoadVectors(Proc):
-    def __init__(self, *fallbacks, vectors: Vectors) -> None:
+    def __init__(self, *fallbacks, vectors: Optional[Vectors], dtype: Optional[torch.dtype] = None) -> None:
         super(LoadVectors, self).__init__()
         self.fallbacks = fallbacks
         self.vectors = vectors
+        self.dtype = dtype
 
     def extra_repr(self) -> str:
         return ', '.join([
             self.vectors.__class__.__name__,
+            f'dtype={self.dtype}',
             *[f'{fallback.__name__}' for fallback in self.fallbacks],
         ])
 
+    def obtain_vectors(self, vocab: Vocab) -> Vectors:
+        return self.vectors
+
     def __call__(self, vocab: Vocab, *, name: str, **kwargs) -> Vocab:
         assert vocab is not None, \
             f"did you forget '{BuildVocab.__name__}' before '{LoadVectors.__name__}'?"
 
-        tok, occ = vocab.load_vectors(*self.fallbacks, vectors=self.vectors)
-        tok = tok / max(1, len(vocab.freq.values())) * 100
-        occ = occ / max(1, sum(vocab.freq.values())) * 100
+        vectors = self.obtain_vectors(vocab=vocab)
+        tok, occ = vocab.load_vectors(*self.fallbacks, vectors=vectors, dtype=self.dtype)
+        tok = tok / max(1, np.count_nonzero(vocab.counts)) * 100
+        occ = occ / max(1, vocab.counts.sum()) * 100
 
-        logger.info(f"{self.vectors} hits {tok:.1f}% tokens "
+        logger.info(f"{vectors} hits {tok:.1f}% tokens "
                     f"and {occ:.1f}% occurrences of {Vocab.__name__} '{name}'")
         return vocab
 
 
 class LoadGlove(LoadVectors):
-    def __init__(self, *fallbacks, name: str, dim: int) -> None:
+    def __init__(self, *fallbacks, name: str, dim: int, restrict: bool = False,
+                 dtype: Optional[torch.dtype] = None) -> None:
         super(LoadGlove, self).__init__(
-            *fallbacks, vectors=Glove(name=name, dim=dim),
+            *fallbacks, vectors=None if restrict else Glove.shared(name=name, dim=dim), dtype=dtype,
         )
+        self.name = name
+        self.dim = dim
+        self.restrict = restrict
+
+    def extra_repr(self) -> str:
+        return ', '.join([
+            f'{Glove.__name__}',
+            f'name={self.name}',
+            f'dim={self.dim}',
+            f'restrict={self.restrict}',
+            f'dtype={self.dtype}',
+            *[f'{fallback.__name__}' for fallback in self.fallbacks],
+        ])
+
+    def obtain_vectors(self, vocab: Vocab) -> Vectors:
+        if self.vectors is not None:
+            return self.vectors
+        return Glove(name=self.name, dim=self.dim, vocab=vocab, fallbacks=self.fallbacks)
 
 
 class LoadFastText(LoadVectors):
-    def __init__(self, *fallbacks, name: str, lang: str) -> None:
+    def __init__(self, *fallbacks, name: str, lang: str, restrict: bool = False,
+                 dtype: Optional[torch.dtype] = None) -> None:
         super(LoadFastText, self).__init__(
-            *fallbacks, vectors=FastText(name=name, lang=lang),
+            *fallbacks, vectors=None if restrict else FastText.shared(name=name, lang=lang), dtype=dtype,
         )
+        self.name = name
+        self.lang = lang
+        self.restrict = restrict
+
+    def extra_repr(self) -> str:
+        return ', '.join([
+            f'{FastText.__name__}',
+            f'name={self.name}',
+            f'lang={self.lang}',
+            f'restrict={self.restrict}',
+            f'dtype={self.dtype}',
+            *[f'{fallback.__name__}' for fallback in self.fallbacks],
+        ])
+
+    def obtain_vectors(self, vocab: Vocab) -> Vectors:
+        if self.vectors is not None:
+            return self.vectors
+        return FastText(name=self.name, lang=self.lang, vocab=vocab, fallbacks=self.fallbacks)
@@ -1,44 +1,260 @@
-from typing import List, Iterator
+from collections import OrderedDict
+from typing import List, Iterator, Optional, Sequence, Dict
 
-from torch.utils.data import BatchSampler as _BatchSampler, Sampler
+import numpy as np
+import torch
+import torch.distributed as dist
+from torch.utils.data import BatchSampler as _BatchSampler, Sampler, SequentialSampler
 
 __all__ = [
-    'BatchSampler',
+    'split_batches', 'split_padded_batches',
+    'BatchSampler', 'BucketBatchSampler',
+    'DistributedBatchSampler',
 ]
 
 
+def split_batches(indices: np.ndarray, sizes: np.ndarray, batch_size: int, drop_last: bool) -> List[np.ndarray]:
+    mask = sizes <= batch_size
+    indices, sizes = indices[mask], sizes[mask]
+
+    acc_sizes = np.cumsum(sizes)
+    sections, start = [], 0
+    while start < indices.shape[0]:
+        offset = acc_sizes[start - 1] if start > 0 else 0
+        start = int(np.searchsorted(acc_sizes, offset + batch_size, side='right'))
+        sections.append(start)
+
+    if len(sections) == 0:
+        return []
+
+    batch_indices = np.split(indices, sections[:-1])
+    if drop_last:
+        batch_indices = batch_indices[:-1]
+
+    return batch_indices
+
+
+def split_padded_batches(indices: np.ndarray, sizes: np.ndarray,
+                         batch_size: int, drop_last: bool) -> List[np.ndarray]:
+    mask = sizes <= batch_size
+    indices, sizes = indices[mask], sizes[mask]
+
+    order = np.argsort(sizes, kind='stable')
+    indices, sizes = indices[order], sizes[order]
+
+    batch_indices, start = [], 0
+    while start < indices.shape[0]:
+        window = sizes[start:start + batch_size // max(1, sizes[start].item())]
+        costs = window * np.arange(1, window.shape[0] + 1)
+
+        end = start + int(np.searchsorted(costs, batch_size, side='right'))
+        batch_indices.append(indices[start:end])
+        start = end
+
+    if drop_last:
+        batch_indices = batch_indices[:-1]
+
+    return batch_indices
+
+
 class BatchSampler(_BatchSampler):
     def __init__(self, dataset, sampler: Sampler[int], batch_size: int, drop_last: bool) -> None:
         super(BatchSampler, self).__init__(sampler, batch_size, drop_last)
 
         self.dataset = dataset
+        self.position = 0
+        self.resume = False
         self.reset_indices()
 
     def reset_indices(self) -> None:
+        indices = np.fromiter(iter(self.sampler), dtype=np.int64, count=len(self.sampler))
+        self.batch_indices = split_batches(
+            indices=indices, sizes=self.dataset.sizes[indices],
+            batch_size=self.batch_size, drop_last=self.drop_last,
+        )
+
+    def __len__(self) -> int:
+        return len(self.batch_indices)
+
+    def rewind_(self) -> None:
+        if not self.resume and self.position > 0:
+            self.position = 0
+            self.reset_indices()
+
+        self.resume = True
+
+    def __iter__(self) -> Iterator[List[int]]:
+        self.rewind_()
+        self.resume = False
+
+        while self.position < len(self.batch_indices):
+            batch_indices = self.batch_indices[self.position]
+            self.position += 1
+            yield batch_indices.tolist()
+
+        self.position = 0
+        self.reset_indices()
+
+    def get_generators(self) -> Dict[str, torch.Generator]:
+        generators = {}
+        if getattr(self.sampler, 'generator', None) is not None:
+            generators['sampler_generator'] = self.sampler.generator
+        return generators
+
+    def state_dict(self, destination: OrderedDict = None, prefix: str = '',
+                   keep_vars: bool = False) -> OrderedDict:
+        if destination is None:
+            destination = OrderedDict()
+            destination._metadata = OrderedDict()
+
+        batch_sizes = [batch_indices.shape[0] for batch_indices in self.batch_indices]
+        batch_indices = np.concatenate([np.zeros((0,), dtype=np.int64), *self.batch_indices])
+
+        destination[prefix + 'position'] = self.position
+        destination[prefix + 'batch_sizes'] = torch.tensor(batch_sizes, dtype=torch.long)
+        destination[prefix + 'batch_indices'] = torch.from_numpy(batch_indices)
+        for name, generator in self.get_generators().items():
+            destination[prefix + name] = generator.get_state()
+
+        return destination
+
+    def load_state_dict(self, state_dict: OrderedDict, strict: bool = True) -> None:
+        state_dict = dict(state_dict)
+
+        self.position = state_dict.pop('position')
+        batch_sizes = state_dict.pop('batch_sizes').numpy()
+        batch_indices = state_dict.pop('batch_indices').numpy()
+
         self.batch_indices = []
+        if batch_sizes.shape[0] > 0:
+            self.batch_indices = np.split(batch_indices, np.cumsum(batch_sizes)[:-1])
+        for name, generator in self.get_generators().items():
+            generator.set_state(state_dict.pop(name))
+        self.resume = True
 
-        batch_size = 0
-        batch_indices = []
-        for index in self.sampler:
-            data_size = self.dataset.get_size(self.dataset[index])
+        if strict:
+            assert len(state_dict) == 0, f'unexpected keys {list(state_dict.keys())}'
 
-            if (data_size + batch_size) > self.batch_size:
-                if batch_size > 0:
-                    self.batch_indices.append(batch_indices)
-                    batch_size = 0
-                    batch_indices = []
-                else:
-                    continue
 
-            batch_indices.append(index)
-            batch_size += data_size
+class BucketBatchSampler(BatchSampler):
+    def __init__(self, dataset, sampler: Sampler[int], batch_size: int, drop_last: bool,
+                 chunk_size: int = 16384, boundaries: Optional[Sequence[int]] = None,
+                 shuffle: bool = True, generator: Optional[torch.Generator] = None) -> None:
+        self.chunk_size = chunk_size
+        self.boundaries = boundaries
+        self.shuffle = shuffle
+        self.generator = generator
 
-        if not self.drop_last and batch_size > 0:
-            self.batch_indices.append(batch_indices)
+        super(BucketBatchSampler, self).__init__(
+            dataset=dataset, sampler=sampler,
+            batch_size=batch_size, drop_last=drop_last,
+        )
 
-    def __len__(self) -> int:
-        return len(self.batch_indices)
+    def reset_indices(self) -> None:
+        indices = np.fromiter(iter(self.sampler), dtype=np.int64, count=len(self.sampler))
+        sizes = self.dataset.sizes[indices]
 
-    def __iter__(self) -> Iterator[List[int]]:
-        yield from self.batch_indices
+        if self.boundaries is None:
+            groups = [
+                slice(start, start + self.chunk_size)
+                for start in range(0, indices.shape[0], self.chunk_size)
+            ]
+        else:
+            buckets = np.digitize(sizes, bins=np.asarray(self.boundaries))
+            groups = [buckets == bucket for bucket in np.unique(buckets)]
+
+        batch_indices = [
+            batch
+            for group in groups
+            for batch in split_padded_batches(
+                indices=indices[group], sizes=sizes[group],
+                batch_size=self.batch_size, drop_last=False,
+            )
+        ]
+
+        if self.drop_last and len(batch_indices) > 0:
+            costs = [batch.shape[0] * self.dataset.sizes[batch].max() for batch in batch_indices]
+            del batch_indices[int(np.argmin(costs))]
+
+        if self.shuffle:
+            permutation = torch.randperm(len(batch_indices), generator=self.generator).tolist()
+            batch_indices = [batch_indices[index] for index in permutation]
+
+        self.batch_indices = batch_indices
+
+    def get_generators(self) -> Dict[str, torch.Generator]:
+        generators = super(BucketBatchSampler, self).get_generators()
+        if self.generator is not None and self.generator is not getattr(self.sampler, 'generator', None):
+            generators['generator'] = self.generator
+        return generators
+
+
+class DistributedBatchSampler(BatchSampler):
+    def __init__(self, dataset, batch_size: int, drop_last: bool, shuffle: bool = True, seed: int = 0,
+                 rank: Optional[int] = None, world_size: Optional[int] = None) -> None:
+        if rank is None:
+            rank = dist.get_rank() if dist.is_available() and dist.is_initialized() else 0
+        if world_size is None:
+            world_size = dist.get_world_size() if dist.is_available() and dist.is_initialized() else 1
+        assert 0 <= rank < world_size, f'{rank} is not in [0, {world_size})'
+
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+        self.rank = rank
+        self.world_size = world_size
+        self.generator = torch.Generator()
+
+        super(DistributedBatchSampler, self).__init__(
+            dataset=dataset, sampler=SequentialSampler(dataset),
+            batch_size=batch_size, drop_last=drop_last,
+        )
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
         self.reset_indices()
+
+    def reset_indices(self) -> None:
+        self.generator.manual_seed(self.seed + self.epoch)
+        self.epoch += 1
+
+        if self.shuffle:
+            indices = torch.randperm(len(self.dataset), generator=self.generator).numpy()
+        else:
+            indices = np.arange(len(self.dataset), dtype=np.int64)
+
+        sizes = self.dataset.sizes
+        batch_indices = split_batches(
+            indices=indices, sizes=sizes[indices],
+            batch_size=self.batch_size, drop_last=self.drop_last,
+        )
+
+        num_batches = len(batch_indices)
+        if self.drop_last:
+            num_batches = num_batches // self.world_size * self.world_size
+        elif num_batches > 0:
+            num_batches = (num_batches + self.world_size - 1) // self.world_size * self.world_size
+
+        # deal batches out in snake order of their token numbers, one batch of each group per rank
+        num_tokens = np.array([sizes[batch].sum() for batch in batch_indices], dtype=np.int64)
+        order = np.argsort(-num_tokens, kind='stable')
+        order = np.resize(order, num_batches).reshape((-1, self.world_size))
+        order[1::2] = order[1::2, ::-1]
+
+        groups = range(order.shape[0])
+        if self.shuffle:
+            groups = torch.randperm(order.shape[0], generator=self.generator).tolist()
+        self.batch_indices = [batch_indices[order[group, self.rank]] for group in groups]
+
+    def state_dict(self, destination: OrderedDict = None, prefix: str = '',
+                   keep_vars: bool = False) -> OrderedDict:
+        destination = super(DistributedBatchSampler, self).state_dict(
+            destination=destination, prefix=prefix, keep_vars=keep_vars,
+        )
+        destination[prefix + 'epoch'] = self.epoch
+        return destination
+
+    def load_state_dict(self, state_dict: OrderedDict, strict: bool = True) -> None:
+        state_dict = dict(state_dict)
+        self.epoch = state_dict.pop('epoch')
+        super(DistributedBatchSampler, self).load_state_dict(state_dict=state_dict, strict=strict)
@@ -0,0 +1,165 @@
+import logging
+from pathlib import Path
+from typing import Callable, Tuple
+
+import torch
+from torch import Tensor
+from torch.nn import functional as F
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'blocked_topk',
+    'IVFIndex',
+]
+
+Lookup = Callable[[Tensor], Tensor]
+
+
+def merge_topk(scores: Tensor, indices: Tensor, k: int) -> Tuple[Tensor, Tensor]:
+    scores, index = torch.topk(scores, k=min(k, scores.size()[-1]), dim=-1)
+    return scores, torch.gather(indices, dim=-1, index=index)
+
+
+@torch.no_grad()
+def blocked_topk(queries: Tensor, lookup: Lookup, num_keys: int, k: int,
+                 normalize: bool = True, block_size: int = 65536) -> Tuple[Tensor, Tensor]:
+    if normalize:
+        queries = F.normalize(queries, p=2, dim=-1)
+
+    scores = queries.new_empty((queries.size()[0], 0))
+    indices = torch.empty((queries.size()[0], 0), dtype=torch.long, device=queries.device)
+
+    for start in range(0, num_keys, block_size):
+        index = torch.arange(start, min(start + block_size, num_keys), dtype=torch.long)
+        keys = lookup(index).to(device=queries.device, dtype=queries.dtype)
+        if normalize:
+            keys = F.normalize(keys, p=2, dim=-1)
+
+        block_scores, block_indices = merge_topk(
+            scores=queries @ keys.t(),
+            indices=index.to(device=queries.device)[None, :].expand((queries.size()[0], -1)), k=k,
+        )
+        scores, indices = merge_topk(
+            scores=torch.cat([scores, block_scores], dim=-1),
+            indices=torch.cat([indices, block_indices], dim=-1), k=k,
+        )
+
+    return scores, indices
+
+
+def assign(points: Tensor, centroids: Tensor, block_size: int) -> Tensor:
+    return torch.cat([
+        torch.argmax(points[start:start + block_size] @ centroids.t(), dim=-1)
+        for start in range(0, points.size()[0], block_size)
+    ], dim=0)
+
+
+class IVFIndex(object):
+    def __init__(self, centroids: Tensor, order: Tensor, offsets: Tensor, normalize: bool) -> None:
+        super(IVFIndex, self).__init__()
+
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+        self.normalize = normalize
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.extra_repr()})'
+
+    def extra_repr(self) -> str:
+        return ', '.join([
+            f'{self.order.size()[0]}',
+            f'num_clusters={self.centroids.size()[0]}',
+            f'normalize={self.normalize}',
+        ])
+
+    @classmethod
+    @torch.no_grad()
+    def build(cls, lookup: Lookup, num_keys: int, num_clusters: int, normalize: bool = True,
+              num_iterations: int = 10, num_samples: int = 262144, block_size: int = 65536,
+              generator: torch.Generator = None) -> 'IVFIndex':
+        sample = torch.randperm(num_keys, generator=generator)[:max(num_clusters, num_samples)]
+        points = lookup(torch.sort(sample).values).float()
+        if normalize:
+            points = F.normalize(points, p=2, dim=-1)
+
+        centroids = points[torch.randperm(points.size()[0], generator=generator)[:num_clusters]]
+        for _ in range(num_iterations):
+            assignment = assign(points, centroids=centroids, block_size=block_size)
+
+            sums = torch.zeros_like(centroids).index_add_(0, assignment, points)
+            counts = torch.bincount(assignment, minlength=num_clusters).clamp_min(1)
+            centroids = sums / counts[:, None].float()
+            if normalize:
+                centroids = F.normalize(centroids, p=2, dim=-1)
+
+        assignments = []
+        for start in range(0, num_keys, block_size):
+            keys = lookup(torch.arange(start, min(start + block_size, num_keys), dtype=torch.long)).float()
+            if normalize:
+                keys = F.normalize(keys, p=2, dim=-1)
+            assignments.append(assign(keys, centroids=centroids, block_size=block_size))
+        assignment = torch.cat(assignments, dim=0)
+
+        order = torch.argsort(assignment, stable=True)
+        offsets = torch.zeros((num_clusters + 1,), dtype=torch.long)
+        offsets[1:] = torch.cumsum(torch.bincount(assignment, minlength=num_clusters), dim=0)
+
+        return cls(centroids=centroids, order=order, offsets=offsets, normalize=normalize)
+
+    @torch.no_grad()
+    def search(self, queries: Tensor, lookup: Lookup, k: int, nprobe: int = 8,
+               block_size: int = 65536) -> Tuple[Tensor, Tensor]:
+        queries = queries.float()
+        if self.normalize:
+            queries = F.normalize(queries, p=2, dim=-1)
+
+        nprobe = min(nprobe, self.centroids.size()[0])
+        _, probes = torch.topk(queries @ self.centroids.t(), k=nprobe, dim=-1)
+
+        # score every probed cluster against all queries probing it at once, then merge per query
+        scores = queries.new_full((probes.numel(), k), fill_value=-float('inf'))
+        indices = torch.full((probes.numel(), k), fill_value=-1, dtype=torch.long)
+
+        pairs = torch.argsort(probes.flatten(), stable=True)
+        clusters, counts = torch.unique_consecutive(probes.flatten()[pairs], return_counts=True)
+        for cluster, pair in zip(clusters.tolist(), torch.split(pairs, counts.tolist())):
+            candidates = self.order[self.offsets[cluster]:self.offsets[cluster + 1]]
+            if candidates.size()[0] == 0:
+                continue
+
+            for start in range(0, candidates.size()[0], block_size):
+                index = candidates[start:start + block_size]
+                keys = lookup(index).float()
+                if self.normalize:
+                    keys = F.normalize(keys, p=2, dim=-1)
+
+                block_scores, block_indices = merge_topk(
+                    scores=torch.cat([scores[pair], queries[pair // nprobe] @ keys.t()], dim=-1),
+                    indices=torch.cat([indices[pair], index[None, :].expand((pair.size()[0], -1))], dim=-1), k=k,
+                )
+                scores[pair, :block_scores.size()[1]] = block_scores
+                indices[pair, :block_indices.size()[1]] = block_indices
+
+        return merge_topk(
+            scores=scores.view((queries.size()[0], nprobe * k)),
+            indices=indices.view((queries.size()[0], nprobe * k)), k=k,
+        )
+
+    def state_dict(self) -> dict:
+        return {
+            'centroids': self.centroids,
+            'order': self.order,
+            'offsets': self.offsets,
+            'normalize': self.normalize,
+        }
+
+    def save(self, path: Path) -> None:
+        logger.info(f'saving index to {path}')
+        torch.save(self.state_dict(), f=path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'IVFIndex':
+        logger.info(f'loading index from {path}')
+        return cls(**torch.load(f=path))
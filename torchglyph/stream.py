@@ -0,0 +1,53 @@
+import itertools
+from collections import Counter
+from typing import Any, Dict, Iterator, Optional, Tuple, TYPE_CHECKING
+
+from torchglyph.proc import Identity
+
+if TYPE_CHECKING:
+    from torchglyph.pipe import Pipe
+
+__all__ = [
+    'StreamMixin',
+]
+
+
+class StreamMixin(object):
+    pipes: Dict[str, 'Pipe']
+
+    def iter_raw(self) -> Iterator[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def build_vocab_(self, num_items: Optional[int] = None, special_tokens: Tuple[str, ...] = (),
+                     max_size: Optional[int] = None, min_freq: int = 1) -> 'StreamMixin':
+        pipes, names, counters = {}, {}, {}
+        for name, pipe in self.pipes.items():
+            if not isinstance(pipe.vocab_proc, Identity):
+                pipes[id(pipe)] = pipe
+                names.setdefault(id(pipe), []).append(name)
+                counters.setdefault(id(pipe), Counter())
+
+        for item in itertools.islice(self.iter_raw(), num_items):
+            for name, pipe in self.pipes.items():
+                if id(pipe) in pipes:
+                    pipe.pre_proc(item[name], counter=counters[id(pipe)], name=name)
+
+        for key, pipe in pipes.items():
+            name = ', '.join(sorted(names[key]))
+            pipe.vocab = pipe.vocab_proc(
+                counters[key],
+                name=f'[{name}]' if ', ' in name else name,
+                special_tokens=special_tokens,
+                max_size=max_size, min_freq=min_freq,
+            )
+
+        return self
+
+    def process(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            name: pipe.post_proc(
+                pipe.pre_proc(item[name], counter=Counter(), name=name),
+                vocab=pipe.vocab, name=name,
+            )
+            for name, pipe in self.pipes.items()
+        }
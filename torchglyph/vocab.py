@@ -1,15 +1,24 @@
+import fcntl
+import hashlib
+import itertools
 import logging
+import os
+import threading
 from collections import Counter, OrderedDict
 from pathlib import Path
-from typing import Optional, Tuple, List, Dict
+from typing import Optional, Tuple, List, Dict, Iterable, Any, Set, Callable, Union
+from weakref import WeakValueDictionary
 
+import numpy as np
 import torch
 from torch import Tensor
 from torch.nn import init
-from tqdm import tqdm
 
 from torchglyph import data_dir
-from torchglyph.io import DownloadMixin
+from torchglyph.formats.vector import load_vector_file
+from torchglyph.io import DownloadMixin, cache_path
+from torchglyph.meter import TimeMeter
+from torchglyph.search import IVFIndex, blocked_topk
 
 logger = logging.getLogger(__name__)
 
@@ -27,10 +36,11 @@ class Vocab(object):
                  max_size: Optional[int] = None, min_freq: int = 1) -> None:
         super(Vocab, self).__init__()
 
-        self.freq = counter
-        self.itos: Dict[int, str] = {}
+        self.itos: List[str] = []
         self.stoi: Dict[str, int] = {}
+        self.counts: Optional[np.ndarray] = None
         self.vectors: Optional[Tensor] = None
+        self.scales: Optional[Tensor] = None
 
         self.unk_idx = None
         if unk_token is not None:
@@ -47,29 +57,60 @@ class Vocab(object):
         self.pad_token = pad_token
         self.special_tokens = tuple(self.stoi.keys())
 
-        for token, freq in self.freq.most_common(n=max_size):
+        for token, freq in counter.most_common(n=max_size):
             if freq < min_freq:
                 break
             self.add_token_(token)
 
+        self.counts = np.array([counter[token] for token in self.itos], dtype=np.int64)
+
         assert len(self.stoi) == len(self.itos)
 
+    @property
+    def freq(self) -> Counter:
+        return Counter({
+            token: count
+            for token, count in zip(self.itos, self.counts.tolist()) if count > 0
+        })
+
     def __getitem__(self, token: str) -> int:
         return self.stoi.get(token, self.unk_idx)
 
+    def lookup_many(self, tokens: Iterable[str], count: int = -1) -> np.ndarray:
+        return np.fromiter(
+            map(self.stoi.get, tokens, itertools.repeat(self.unk_idx)),
+            dtype=np.int64, count=count,
+        )
+
     def inv(self, index: int) -> str:
-        return self.itos.get(index, self.unk_token)
+        if 0 <= index < len(self.itos):
+            return self.itos[index]
+        return self.unk_token
 
     def add_token_(self, token: str) -> int:
         assert token is not None
 
         if token not in self.stoi:
-            index = len(self.stoi)
-            self.stoi[token] = index
-            self.itos[index] = token
+            self.stoi[token] = len(self.itos)
+            self.itos.append(token)
+            if self.counts is not None:
+                self.counts = np.append(self.counts, 0)
 
         return self.stoi[token]
 
+    def add_tokens_(self, tokens: Iterable[str]) -> None:
+        num_tokens = len(self.itos)
+
+        for token in tokens:
+            assert token is not None
+
+            if token not in self.stoi:
+                self.stoi[token] = len(self.itos)
+                self.itos.append(token)
+
+        if self.counts is not None:
+            self.counts = np.concatenate([self.counts, np.zeros((len(self.itos) - num_tokens,), dtype=np.int64)])
+
     def __repr__(self) -> str:
         return f'{self.__class__.__name__}({self.extra_repr()})'
 
@@ -86,19 +127,50 @@ class Vocab(object):
         return token in self.stoi
 
     @torch.no_grad()
-    def load_vectors(self, *fallbacks, vectors: 'Vectors') -> Tuple[int, int]:
+    def quantize_(self, dtype: torch.dtype) -> None:
+        vectors = self.dequantize()
+
+        if dtype == torch.int8:
+            self.scales = vectors.abs().amax(dim=-1).clamp_min(1e-12) / 127.
+            self.vectors = torch.round(vectors / self.scales[:, None]).to(dtype=torch.int8)
+        else:
+            self.scales = None
+            self.vectors = vectors.to(dtype=dtype)
+
+    @torch.no_grad()
+    def dequantize(self, index: Optional[Tensor] = None, dtype: torch.dtype = torch.float32) -> Tensor:
+        vectors = self.vectors if index is None else self.vectors.index_select(dim=0, index=index)
+        vectors = vectors.to(dtype=dtype)
+
+        if self.scales is not None:
+            scales = self.scales if index is None else self.scales.index_select(dim=0, index=index)
+            vectors = vectors * scales[:, None].to(dtype=dtype)
+
+        return vectors
+
+    @torch.no_grad()
+    def load_vectors(self, *fallbacks, vectors: 'Vectors', dtype: Optional[torch.dtype] = None) -> Tuple[int, int]:
         _, vector_size = vectors.vectors.size()
         self.vectors = torch.empty((len(self), vector_size), dtype=torch.float32)
+        self.scales = None
 
-        tok, occ = 0, 0
-        for token, index in self.stoi.items():
-            if vectors.query_(token, self.vectors[index], *fallbacks):
-                tok += 1
-                occ += self.freq[token]
+        indices = vectors.lookup_(self.itos, *fallbacks)
+        mask = indices >= 0
+
+        self.vectors[mask] = vectors.dequantize(index=indices[mask])
+        unk_vectors = self.vectors.new_empty((len(self) - mask.sum().item(), vector_size))
+        vectors.unk_init_(unk_vectors)
+        self.vectors[~mask] = unk_vectors
+
+        tok = mask.sum().item()
+        occ = self.counts[mask.numpy()].sum().item()
 
         if self.pad_token is not None:
             init.zeros_(self.vectors[self.stoi[self.pad_token]])
 
+        if dtype is not None:
+            self.quantize_(dtype=dtype)
+
         return tok, occ
 
     def state_dict(self, destination: OrderedDict = None, prefix: str = '', **kwargs) -> OrderedDict:
@@ -112,10 +184,10 @@ class Vocab(object):
         destination[prefix + 'pad_token'] = self.pad_token
         destination[prefix + 'special_tokens'] = self.special_tokens
 
-        destination[prefix + 'freq'] = self.freq
-        destination[prefix + 'stoi'] = self.stoi
         destination[prefix + 'itos'] = self.itos
-        destination[prefix + 'vectors'] = self.vectors.detach()
+        destination[prefix + 'counts'] = torch.from_numpy(self.counts)
+        destination[prefix + 'vectors'] = None if self.vectors is None else self.vectors.detach()
+        destination[prefix + 'scales'] = self.scales
 
         return destination
 
@@ -126,10 +198,19 @@ class Vocab(object):
         self.pad_token = state_dict.pop('pad_token')
         self.special_tokens = state_dict.pop('special_tokens')
 
-        self.freq = state_dict.pop('freq')
-        self.stoi = state_dict.pop('stoi')
         self.itos = state_dict.pop('itos')
+        if isinstance(self.itos, dict):
+            self.itos = [self.itos[index] for index in range(len(self.itos))]
+        self.stoi = {token: index for index, token in enumerate(self.itos)}
+        state_dict.pop('stoi', None)
+
+        if 'freq' in state_dict:
+            freq = state_dict.pop('freq')
+            self.counts = np.array([freq[token] for token in self.itos], dtype=np.int64)
+        else:
+            self.counts = state_dict.pop('counts').numpy()
         self.vectors = state_dict.pop('vectors')
+        self.scales = state_dict.pop('scales', None)
 
         if strict:
             assert len(state_dict) == 0
@@ -138,7 +219,13 @@ class Vocab(object):
 class Vectors(Vocab, DownloadMixin):
     vector_format: str
 
-    def __init__(self, root: Path = data_dir, **kwargs) -> None:
+    registry: 'WeakValueDictionary[Tuple[Any, ...], Vectors]' = WeakValueDictionary()
+    pinned: Dict[Tuple[Any, ...], 'Vectors'] = {}
+    registry_lock = threading.Lock()
+
+    def __init__(self, root: Path = data_dir, num_workers: int = 0, mmap: bool = False,
+                 dtype: torch.dtype = torch.float32, decompress: bool = True,
+                 vocab: Optional[Vocab] = None, fallbacks: Tuple[Callable[[str], str], ...] = (), **kwargs) -> None:
         super(Vectors, self).__init__(
             counter=Counter(),
             unk_token=None,
@@ -147,53 +234,204 @@ class Vectors(Vocab, DownloadMixin):
             max_size=None, min_freq=1,
         )
 
-        path, = self.paths(root=root, **kwargs)  # type:Path
-        self.cache_(path=path)
+        self.fallback_cache: Dict[Any, Dict[str, int]] = {}
 
-    def cache_(self, path: Path) -> None:
-        torch_path = path.with_suffix('.pt')
+        keep, suffix = None, ''
+        if vocab is not None:
+            keep = set(vocab.itos)
+            for fallback in fallbacks:
+                keep.update(fallback(token) for token in vocab.itos)
+            digest = hashlib.sha1('\n'.join(sorted(keep)).encode('utf-8')).hexdigest()
+            suffix = f'.{digest[:16]}'
 
-        if torch_path.exists():
-            logger.info(f'loading from {torch_path}')
-            self.load_state_dict(state_dict=torch.load(f=torch_path))
+        path, = self.paths(root=root, decompress=decompress, **kwargs)  # type:Path
+        if mmap:
+            self.cache_mmap_(path=path, keep=keep, suffix=suffix, dtype=dtype, num_workers=num_workers)
         else:
-            vectors = []
-            with path.open('r', encoding='utf-8') as fp:
+            self.cache_(path=path, keep=keep, suffix=suffix, num_workers=num_workers)
+            if dtype != torch.float32:
+                self.quantize_(dtype=dtype)
 
-                num_embeddings, embedding_dim = None, None
-                if self.vector_format == 'word2vec':
-                    num_embeddings, embedding_dim = map(int, next(fp).strip().split(' '))
+        self.path, self.suffix = cache_path(path), suffix
+        self.index: Optional[IVFIndex] = None
+        self.search_meter = TimeMeter()
 
-                for raw in tqdm(fp, desc=f'caching {path}', unit=' tokens', total=num_embeddings):
-                    token, *embeddings = raw.rstrip().split(' ')
+    @classmethod
+    def shared(cls, weak: bool = True, **kwargs) -> 'Vectors':
+        if kwargs.get('vocab', None) is not None:
+            return cls(**kwargs)
+
+        kwargs.setdefault('root', data_dir)
+        key = (cls, *sorted(
+            (name, value) for name, value in kwargs.items()
+            if name not in ('num_workers', 'vocab', 'fallbacks')
+        ))
+
+        with cls.registry_lock:
+            vectors = cls.registry.get(key, None)
+            if vectors is None:
+                vectors = cls(**kwargs)
+                cls.registry[key] = vectors
+            if not weak:
+                cls.pinned[key] = vectors
+
+        return vectors
+
+    def parse_(self, path: Path, keep: Optional[Set[str]] = None, num_workers: int = 0) -> None:
+        logger.info(f'caching {path}')
+        tokens, vectors = load_vector_file(
+            path, header=self.vector_format == 'word2vec',
+            sep=' ', keep=keep, num_workers=num_workers,
+        )
 
-                    if embedding_dim is None:
-                        embedding_dim = len(embeddings)
-                    assert embedding_dim == len(embeddings), f'{embedding_dim} != {len(embeddings)} :: {token}'
+        self.add_tokens_(tokens)
+        if len(self.itos) != len(tokens):
+            indices = {}
+            for index, token in enumerate(tokens):
+                indices.setdefault(token, index)
+            vectors = vectors[list(indices.values())]
+        self.vectors = torch.from_numpy(vectors)
 
-                    self.add_token_(token)
-                    vectors.append([float(v) for v in embeddings])
+    def cache_(self, path: Path, keep: Optional[Set[str]] = None, suffix: str = '', num_workers: int = 0) -> None:
+        torch_path = cache_path(path).with_suffix(f'{suffix}.pt')
 
-            self.vectors = torch.tensor(vectors, dtype=torch.float32)
+        if torch_path.exists():
+            logger.info(f'loading from {torch_path}')
+            self.load_state_dict(state_dict=torch.load(f=torch_path, weights_only=False))
+        else:
+            self.parse_(path=path, keep=keep, num_workers=num_workers)
 
             logger.info(f'saving to {torch_path}')
             torch.save(obj=self.state_dict(), f=torch_path)
 
+    def cache_mmap_(self, path: Path, keep: Optional[Set[str]] = None, suffix: str = '',
+                    dtype: torch.dtype = torch.float32, num_workers: int = 0) -> None:
+        if dtype == torch.bfloat16:
+            raise ValueError(f'{dtype} vectors can not be memory mapped')
+
+        tokens_path = cache_path(path).with_suffix(f'{suffix}.tokens')
+        if dtype != torch.float32:
+            suffix = f'{suffix}.{str(dtype).split(".")[-1]}'
+        npy_path = cache_path(path).with_suffix(f'{suffix}.npy')
+        scales_path = cache_path(path).with_suffix(f'{suffix}.scales.npy')
+
+        lock_path = cache_path(path).with_suffix(f'{suffix}.lock')
+        with lock_path.open(mode='w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if npy_path.exists() and tokens_path.exists():
+                    logger.info(f'loading from {npy_path}')
+                    with tokens_path.open(mode='r', encoding='utf-8') as fp:
+                        self.add_tokens_(fp.read().split('\n'))
+                else:
+                    self.parse_(path=path, keep=keep, num_workers=num_workers)
+                    if dtype != torch.float32:
+                        self.quantize_(dtype=dtype)
+
+                    logger.info(f'saving to {npy_path}')
+                    tmp_path = tokens_path.with_suffix(f'.{os.getpid()}.tmp')
+                    with tmp_path.open(mode='w', encoding='utf-8') as fp:
+                        fp.write('\n'.join(self.itos))
+                    os.replace(tmp_path, tokens_path)
+
+                    if self.scales is not None:
+                        tmp_path = scales_path.with_suffix(f'.{os.getpid()}.npy')
+                        np.save(tmp_path, self.scales.numpy())
+                        os.replace(tmp_path, scales_path)
+
+                    tmp_path = npy_path.with_suffix(f'.{os.getpid()}.npy')
+                    np.save(tmp_path, self.vectors.numpy())
+                    os.replace(tmp_path, npy_path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        self.vectors = torch.from_numpy(np.load(npy_path, mmap_mode='c'))
+        if dtype == torch.int8:
+            self.scales = torch.from_numpy(np.load(scales_path, mmap_mode='c'))
+        assert len(self.itos) == self.vectors.size()[0], f'{len(self.itos)} != {self.vectors.size()[0]}'
+
+    def lookup_(self, tokens: Iterable[str], *fallbacks) -> Tensor:
+        memo = [self.fallback_cache.setdefault(fallback, {}) for fallback in fallbacks]
+
+        def lookup(token: str) -> int:
+            index = self.stoi.get(token)
+            if index is not None:
+                return index
+
+            for fallback, cache in zip(fallbacks, memo):
+                if token not in cache:
+                    cache[token] = self.stoi.get(fallback(token), -1)
+                if cache[token] >= 0:
+                    return cache[token]
+
+            return -1
+
+        return torch.from_numpy(np.fromiter(map(lookup, tokens), dtype=np.int64))
+
     @torch.no_grad()
     def query_(self, token: str, tensor: Tensor, *fallbacks) -> bool:
-        if token in self:
-            tensor[:] = self.vectors[self.stoi[token]]
+        index, = self.lookup_([token], *fallbacks).tolist()
+        if index >= 0:
+            tensor[:] = self.dequantize(index=torch.tensor([index]))[0]
             return True
 
-        for fallback in fallbacks:
-            new_token = fallback(token)
-            if new_token in self:
-                tensor[:] = self.vectors[self.stoi[new_token]]
-                return True
-
         self.unk_init_(tensor)
         return False
 
+    def build_index_(self, num_clusters: Optional[int] = None, metric: str = 'cosine', **kwargs) -> IVFIndex:
+        assert metric in ('cosine', 'dot'), f'{metric} is not supported'
+
+        if num_clusters is None:
+            num_clusters = max(1, int(len(self) ** 0.5))
+
+        params = ''.join(
+            f'.{name}={value}' for name, value in sorted(kwargs.items())
+            if name not in ('block_size', 'generator')
+        )
+        index_path = self.path.with_suffix(f'{self.suffix}.{metric}.{num_clusters}{params}.ivf.pt')
+        if index_path.exists():
+            self.index = IVFIndex.load(path=index_path)
+        else:
+            logger.info(f'building index of {num_clusters} clusters for {self}')
+            self.index = IVFIndex.build(
+                lookup=self.dequantize, num_keys=len(self),
+                num_clusters=num_clusters, normalize=metric == 'cosine', **kwargs,
+            )
+            self.index.save(path=index_path)
+
+        return self.index
+
+    @torch.no_grad()
+    def topk(self, queries: Union[Tensor, List[str]], k: int = 10, metric: str = 'cosine',
+             nprobe: Optional[int] = None, block_size: int = 65536) -> Tuple[Tensor, Tensor]:
+        assert metric in ('cosine', 'dot'), f'{metric} is not supported'
+
+        if not torch.is_tensor(queries):
+            indices = self.lookup_(queries)
+            assert (indices >= 0).all().item(), f'{[q for q, i in zip(queries, indices.tolist()) if i < 0]}'
+            queries = self.dequantize(index=indices)
+
+        self.search_meter.tik()
+        if nprobe is not None and self.index is not None:
+            assert self.index.normalize == (metric == 'cosine'), f'{self.index} does not support {metric}'
+            scores, indices = self.index.search(queries, lookup=self.dequantize, k=k, nprobe=nprobe)
+        else:
+            scores, indices = blocked_topk(
+                queries.float(), lookup=self.dequantize, num_keys=len(self),
+                k=k, normalize=metric == 'cosine', block_size=block_size,
+            )
+        self.search_meter.tok(num_units=queries.size()[0])
+
+        logger.debug(f'{self} searches {self.search_meter.units_per_second} queries/s')
+        return scores, indices
+
+    def most_similar(self, tokens: List[str], k: int = 10, **kwargs) -> List[List[Tuple[str, float]]]:
+        scores, indices = self.topk(tokens, k=k, **kwargs)
+        return [
+            [(self.inv(index), score) for score, index in zip(ss, ii) if index >= 0]
+            for ss, ii in zip(scores.tolist(), indices.tolist())
+        ]
+
     @staticmethod
     def unk_init_(tensor: Tensor) -> None:
         init.normal_(tensor)
@@ -202,8 +440,13 @@ class Vectors(Vocab, DownloadMixin):
 class Glove(Vectors):
     vector_format = 'glove'
 
-    def __init__(self, name: str, dim: int, root: Path = data_dir) -> None:
-        super(Glove, self).__init__(root=root, name=name, dim=dim)
+    def __init__(self, name: str, dim: int, root: Path = data_dir, num_workers: int = 0,
+                 mmap: bool = False, dtype: torch.dtype = torch.float32, decompress: bool = True,
+                 vocab: Optional[Vocab] = None, fallbacks: Tuple[Callable[[str], str], ...] = ()) -> None:
+        super(Glove, self).__init__(
+            root=root, num_workers=num_workers, mmap=mmap, dtype=dtype, decompress=decompress,
+            vocab=vocab, fallbacks=fallbacks, name=name, dim=dim,
+        )
 
     @classmethod
     def get_urls(cls, name: str, dim: int) -> List[Tuple[str, ...]]:
@@ -217,8 +460,13 @@ class Glove(Vectors):
 class FastText(Vectors):
     vector_format = 'word2vec'
 
-    def __init__(self, name: str, lang: str, root: Path = data_dir) -> None:
-        super(FastText, self).__init__(root=root, name=name, lang=lang)
+    def __init__(self, name: str, lang: str, root: Path = data_dir, num_workers: int = 0,
+                 mmap: bool = False, dtype: torch.dtype = torch.float32, decompress: bool = True,
+                 vocab: Optional[Vocab] = None, fallbacks: Tuple[Callable[[str], str], ...] = ()) -> None:
+        super(FastText, self).__init__(
+            root=root, num_workers=num_workers, mmap=mmap, dtype=dtype, decompress=decompress,
+            vocab=vocab, fallbacks=fallbacks, name=name, lang=lang,
+        )
 
     @classmethod
     def get_urls(cls, name: str, lang: str) -> List[Tuple[str, ...]]: